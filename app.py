@@ -12,6 +12,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.agent import ProcurementAgent
+from src.data_store import get_data_store
 from use_cases.create_po import POCreator
 from use_cases.validate_invoice import InvoiceValidator
 from use_cases.price_comparison import PriceComparator
@@ -21,7 +22,10 @@ from use_cases.price_comparison import PriceComparator
 @st.cache_resource
 def load_agent():
     try:
-        return ProcurementAgent()
+        agent = ProcurementAgent()
+        # Cached across reruns, so it has to pick up rebuilt vector stores itself
+        agent.rag_engine.start_auto_reload()
+        return agent
     except Exception as e:
         st.error(f"Failed to load agent: {str(e)}")
         st.info("Please ensure you have:")
@@ -31,9 +35,13 @@ def load_agent():
         return None
 
 agent = load_agent()
-po_creator = POCreator()
-invoice_validator = InvoiceValidator()
-price_comparator = PriceComparator()
+# Tables are loaded once per process, not on every rerun
+data_store = get_data_store()
+# Reload edited CSVs (and rebuild the supplier ranking) without a restart
+data_store.start_auto_refresh()
+po_creator = POCreator(data_store)
+invoice_validator = InvoiceValidator(data_store)
+price_comparator = PriceComparator(data_store)
 
 # Header
 st.title("🏭 Bio Farma Procurement Assistant")
@@ -57,13 +65,12 @@ if use_case == "💬 General Chat":
         
         if st.button("Submit"):
             if user_query:
-                with st.spinner("Thinking..."):
-                    try:
-                        response = agent.query(user_query)
-                        st.success("Response:")
-                        st.write(response)
-                    except Exception as e:
-                        st.error(f"Error: {str(e)}")
+                try:
+                    st.success("Response:")
+                    # Render tokens as they arrive instead of waiting for the full answer
+                    st.write_stream(agent.query_stream(user_query))
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
 
 # Use Case 2: Create PO
 elif use_case == "📝 Create Purchase Order":
@@ -3,34 +3,49 @@ Bio Farma Procurement Assistant - Flask Application
 Single file with API endpoints and HTML interface
 """
 
+import io
 import sys
+import json
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, render_template_string, request, jsonify, Response, stream_with_context
 import pandas as pd
 from src.agent import ProcurementAgent
+from src.intent_router import IntentRouter
+from src.data_store import get_data_store
+from src.sse import sse_event
 from use_cases.create_po import POCreator
-from use_cases.validate_invoice import InvoiceValidator
+from use_cases.validate_invoice import InvoiceValidator, read_invoice_csv
 from use_cases.price_comparison import PriceComparator
+from use_cases.replenishment import ReplenishmentPlanner
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'biofarma-procurement-2024'
 
-# Initialize components
+# Initialize components; the use cases share one copy of the CSV tables
+data_store = get_data_store()
+# Reload edited CSVs (and rebuild the supplier ranking) without a restart
+data_store.start_auto_refresh()
+po_creator = POCreator(data_store)
+invoice_validator = InvoiceValidator(data_store)
+price_comparator = PriceComparator(data_store)
+replenishment_planner = ReplenishmentPlanner(data_store, po_creator)
+
 try:
-    agent = ProcurementAgent()
+    # Structured chat questions reuse the use-case instances below
+    agent = ProcurementAgent(router=IntentRouter(po_creator, invoice_validator, price_comparator))
+    # Concurrent /api/chat requests share one embedding call and one FAISS search
+    agent.rag_engine.enable_micro_batching()
+    # Pick up rebuilt vector stores without a restart
+    agent.rag_engine.start_auto_reload()
     agent_loaded = True
 except Exception as e:
     agent = None
     agent_loaded = False
     print(f"⚠️  Warning: Agent failed to load: {str(e)}")
 
-po_creator = POCreator()
-invoice_validator = InvoiceValidator()
-price_comparator = PriceComparator()
-
 # HTML Template (embedded in same file)
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -185,6 +200,10 @@ HTML_TEMPLATE = """
             border-left: 5px solid #667eea;
         }
         
+        .stream-text {
+            white-space: pre-wrap;
+        }
+        
         .result-box.success {
             background: #d4edda;
             border-left-color: #28a745;
@@ -453,30 +472,55 @@ HTML_TEMPLATE = """
             hideResult('chat-result');
             
             try {
-                const response = await fetch('/api/chat', {
+                const response = await fetch('/api/chat/stream', {
                     method: 'POST',
                     headers: {'Content-Type': 'application/json'},
                     body: JSON.stringify({query: query})
                 });
                 
-                const data = await response.json();
-                hideLoading('chat-loading');
+                if (!response.ok) {
+                    const data = await response.json();
+                    throw new Error(data.error || response.statusText);
+                }
                 
-                if (data.error) {
-                    showResult('chat-result', `
-                        <div class="result-box error">
-                            <h3>❌ Error</h3>
-                            <p>${data.error}</p>
-                        </div>
-                    `);
-                } else {
-                    showResult('chat-result', `
-                        <div class="result-box success">
-                            <h3>✅ Response</h3>
-                            <p>${data.response}</p>
-                        </div>
-                    `);
+                // Render tokens as they arrive over server-sent events
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                let output = null;
+                
+                while (true) {
+                    const {value, done} = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, {stream: true});
+                    
+                    const events = buffer.split('\\n\\n');
+                    buffer = events.pop();
+                    for (const event of events) {
+                        const type = (event.match(/^event: (.*)$/m) || [])[1] || 'message';
+                        const dataLine = (event.match(/^data: (.*)$/m) || [])[1];
+                        if (!dataLine) continue;
+                        const payload = JSON.parse(dataLine);
+                        
+                        if (type === 'error') {
+                            throw new Error(payload.error);
+                        }
+                        if (type === 'message') {
+                            if (!output) {
+                                hideLoading('chat-loading');
+                                showResult('chat-result', `
+                                    <div class="result-box success">
+                                        <h3>✅ Response</h3>
+                                        <p class="stream-text" id="chat-stream"></p>
+                                    </div>
+                                `);
+                                output = document.getElementById('chat-stream');
+                            }
+                            output.textContent += payload.delta;
+                        }
+                    }
                 }
+                hideLoading('chat-loading');
             } catch (error) {
                 hideLoading('chat-loading');
                 showResult('chat-result', `
@@ -843,6 +887,34 @@ def api_chat():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/chat/stream', methods=['GET', 'POST'])
+def api_chat_stream():
+    """Streaming chat endpoint (server-sent events)"""
+    if request.method == 'POST':
+        query = (request.get_json(silent=True) or {}).get('query', '')
+    else:
+        query = request.args.get('query', '')
+    
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    
+    if not agent_loaded:
+        return jsonify({'error': 'AI Agent not loaded. Please ensure embeddings are created.'}), 500
+    
+    def generate():
+        try:
+            for delta in agent.query_stream(query):
+                yield sse_event({'delta': delta})
+            yield sse_event({}, event='done')
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/create-po', methods=['POST'])
 def api_create_po():
     """Create purchase order recommendation"""
@@ -876,6 +948,57 @@ def api_validate_invoice():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/validate-invoices/batch', methods=['POST'])
+def api_validate_invoices_batch():
+    """
+    Bulk 3-way matching, streamed as NDJSON (one line per invoice, then a summary)
+    
+    Body: {"invoice_numbers": [...]}, {"all": true, "pending_only": false},
+    an uploaded CSV file field 'file', or a text/csv body with the invoices.csv columns.
+    """
+    try:
+        if 'file' in request.files:
+            options = {'invoices': read_invoice_csv(request.files['file'])}
+        elif request.mimetype == 'text/csv':
+            options = {'invoices': read_invoice_csv(io.BytesIO(request.get_data()))}
+        else:
+            data = request.get_json(silent=True) or {}
+            invoice_numbers = data.get('invoice_numbers')
+            if data.get('all'):
+                invoices = invoice_validator.invoices_df
+                if data.get('pending_only'):
+                    invoices = invoices[invoices['payment_status'] != 'Paid']
+                options = {'invoices': invoices}
+            elif isinstance(invoice_numbers, list) and invoice_numbers:
+                options = {'invoice_numbers': invoice_numbers}
+            else:
+                return jsonify({'error': 'Provide invoice_numbers, all, or a CSV file'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        try:
+            yield from invoice_validator.stream_report(**options)
+        except Exception as e:
+            # The 200 is already sent: report the failure as the last line
+            yield json.dumps({'error': str(e)}) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson'
+    )
+
+@app.route('/api/replenishment', methods=['POST'])
+def api_replenishment():
+    """Draft POs for every material at or below its reorder point (optional body: {"category": ...})"""
+    try:
+        data = request.get_json(silent=True) or {}
+        drafts = replenishment_planner.run(category=data.get('category') or None)
+        return jsonify(replenishment_planner.report(drafts))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/compare-prices', methods=['POST'])
 def api_compare_prices():
     """Compare prices across suppliers"""
@@ -917,6 +1040,11 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'agent_loaded': agent_loaded,
+        'query_cache': agent.rag_engine.query_cache.stats() if agent_loaded else None,
+        'answer_cache': agent.answer_cache.stats() if agent_loaded and agent.answer_cache else None,
+        'llm_client': agent.client.stats() if agent_loaded else None,
+        'store_version': agent.rag_engine.version if agent_loaded else None,
+        'data_store': data_store.memory_usage(),
         'timestamp': pd.Timestamp.now().isoformat()
     }), 200
 
@@ -930,8 +1058,11 @@ if __name__ == '__main__':
     print(f"🌐 Starting server on http://localhost:5000")
     print(f"📡 API Documentation:")
     print(f"   POST /api/chat             - General chat")
+    print(f"   POST /api/chat/stream      - General chat (server-sent events)")
     print(f"   POST /api/create-po        - Create PO recommendation")
     print(f"   POST /api/validate-invoice - Validate invoice")
+    print(f"   POST /api/validate-invoices/batch - Bulk validation (NDJSON stream)")
+    print(f"   POST /api/replenishment    - Draft POs for materials below reorder point")
     print(f"   POST /api/compare-prices   - Compare supplier prices")
     print(f"   POST /api/price-trend      - Analyze price trends")
     print(f"   GET  /health               - Health check")
@@ -0,0 +1,295 @@
+"""
+Bio Farma Procurement Assistant - ASGI API
+Async counterpart of the app1 API: chat requests await retrieval and the
+model on one event loop instead of holding a worker thread each.
+
+Run with:
+    uvicorn app_asgi:app --host 0.0.0.0 --port 8000
+"""
+
+import io
+import sys
+import json
+import asyncio
+from pathlib import Path
+from urllib.parse import parse_qs
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pandas as pd
+from src.agent import ProcurementAgent
+from src.intent_router import IntentRouter
+from src.data_store import get_data_store
+from src.sse import sse_event
+from use_cases.create_po import POCreator
+from use_cases.validate_invoice import InvoiceValidator, read_invoice_csv
+from use_cases.price_comparison import PriceComparator
+from use_cases.replenishment import ReplenishmentPlanner
+
+# Initialize components; the use cases share one copy of the CSV tables
+data_store = get_data_store()
+# Reload edited CSVs (and rebuild the supplier ranking) without a restart
+data_store.start_auto_refresh()
+po_creator = POCreator(data_store)
+invoice_validator = InvoiceValidator(data_store)
+price_comparator = PriceComparator(data_store)
+replenishment_planner = ReplenishmentPlanner(data_store, po_creator)
+
+try:
+    agent = ProcurementAgent(router=IntentRouter(po_creator, invoice_validator, price_comparator))
+    # Pick up rebuilt vector stores without a restart
+    agent.rag_engine.start_auto_reload()
+    agent_loaded = True
+except Exception as e:
+    agent = None
+    agent_loaded = False
+    print(f"⚠️  Warning: Agent failed to load: {str(e)}")
+
+
+# ====================== HELPERS ======================
+
+async def read_body(receive):
+    """Read the whole request body"""
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        body += message.get('body', b"")
+        more = message.get('more_body', False)
+    return body
+
+
+async def read_json(receive):
+    """
+    Read the whole request body and decode it as JSON (empty dict if absent or malformed)
+
+    Raises ValueError for valid JSON that is not an object (e.g. [] or "x").
+    """
+    body = await read_body(receive)
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    return data
+
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload, default=str).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode())
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# ====================== ROUTES ======================
+
+async def api_chat(data, send):
+    """General chat endpoint"""
+    query = data.get('query', '')
+    if not query:
+        return await send_json(send, {'error': 'No query provided'}, 400)
+    if not agent_loaded:
+        return await send_json(send, {'error': 'AI Agent not loaded. Please ensure embeddings are created.'}, 500)
+
+    response = await agent.aquery(query)
+    await send_json(send, {'response': response})
+
+
+async def api_chat_stream(data, send):
+    """Streaming chat endpoint (server-sent events)"""
+    query = data.get('query', '')
+    if not query:
+        return await send_json(send, {'error': 'No query provided'}, 400)
+    if not agent_loaded:
+        return await send_json(send, {'error': 'AI Agent not loaded. Please ensure embeddings are created.'}, 500)
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+    try:
+        async for delta in agent.aquery_stream(query):
+            await send({'type': 'http.response.body', 'body': sse_event({'delta': delta}).encode('utf-8'), 'more_body': True})
+        final = sse_event({}, event='done')
+    except Exception as e:
+        final = sse_event({'error': str(e)}, event='error')
+    await send({'type': 'http.response.body', 'body': final.encode('utf-8')})
+
+
+async def api_create_po(data, send):
+    """Create purchase order recommendation"""
+    material_code = data.get('material_code', '')
+    quantity = data.get('quantity', 0)
+    # Raw JSON: a string, null or boolean quantity is a bad request, not a 500
+    valid_quantity = isinstance(quantity, (int, float)) and not isinstance(quantity, bool) and quantity > 0
+    if not material_code or not valid_quantity:
+        return await send_json(send, {'error': 'Invalid material code or quantity'}, 400)
+
+    # The use cases are pandas-bound; keep them off the event loop
+    result = await asyncio.to_thread(po_creator.suggest_po, material_code, quantity)
+    await send_json(send, result)
+
+
+async def api_validate_invoice(data, send):
+    """Validate invoice against PO"""
+    invoice_number = data.get('invoice_number', '')
+    if not invoice_number:
+        return await send_json(send, {'error': 'No invoice number provided'}, 400)
+
+    result = await asyncio.to_thread(invoice_validator.validate, invoice_number)
+    await send_json(send, result)
+
+
+async def api_validate_invoices_batch(data, send):
+    """
+    Bulk 3-way matching, streamed as NDJSON (one line per invoice, then a summary)
+
+    Body: {"invoice_numbers": [...]}, {"all": true, "pending_only": false},
+    or a text/csv body with the invoices.csv columns.
+    """
+    try:
+        if 'csv' in data:
+            options = {'invoices': read_invoice_csv(io.BytesIO(data['csv']))}
+        elif data.get('all'):
+            invoices = invoice_validator.invoices_df
+            if data.get('pending_only'):
+                invoices = invoices[invoices['payment_status'] != 'Paid']
+            options = {'invoices': invoices}
+        elif isinstance(data.get('invoice_numbers'), list) and data['invoice_numbers']:
+            options = {'invoice_numbers': data['invoice_numbers']}
+        else:
+            return await send_json(send, {'error': 'Provide invoice_numbers, all, or a text/csv body'}, 400)
+    except ValueError as e:
+        return await send_json(send, {'error': str(e)}, 400)
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/x-ndjson')]
+    })
+    # Each chunk is matched in a worker thread; the loop only forwards the text
+    blocks = invoice_validator.stream_report(**options)
+    final = b""
+    try:
+        while True:
+            block = await asyncio.to_thread(next, blocks, None)
+            if block is None:
+                break
+            await send({'type': 'http.response.body', 'body': block.encode('utf-8'), 'more_body': True})
+    except Exception as e:
+        # The 200 is already sent: report the failure as the last line
+        final = (json.dumps({'error': str(e)}) + "\n").encode('utf-8')
+    await send({'type': 'http.response.body', 'body': final})
+
+
+async def api_replenishment(data, send):
+    """Draft POs for every material at or below its reorder point (optional body: {"category": ...})"""
+    drafts = await asyncio.to_thread(replenishment_planner.run, category=data.get('category') or None)
+    await send_json(send, replenishment_planner.report(drafts))
+
+
+async def api_compare_prices(data, send):
+    """Compare prices across suppliers"""
+    material_code = data.get('material_code', '')
+    if not material_code:
+        return await send_json(send, {'error': 'No material code provided'}, 400)
+
+    result = await asyncio.to_thread(price_comparator.compare_suppliers, material_code)
+    await send_json(send, result)
+
+
+async def api_price_trend(data, send):
+    """Analyze price trends"""
+    material_code = data.get('material_code', '').strip()
+    if not material_code:
+        return await send_json(send, {'error': 'No material code provided'}, 400)
+
+    result = await asyncio.to_thread(price_comparator.price_trend, material_code)
+    await send_json(send, result)
+
+
+async def health_check(data, send):
+    """Health check endpoint"""
+    await send_json(send, {
+        'status': 'healthy',
+        'agent_loaded': agent_loaded,
+        'query_cache': agent.rag_engine.query_cache.stats() if agent_loaded else None,
+        'answer_cache': agent.answer_cache.stats() if agent_loaded and agent.answer_cache else None,
+        'llm_client': agent.client.stats() if agent_loaded else None,
+        'store_version': agent.rag_engine.version if agent_loaded else None,
+        'data_store': data_store.memory_usage(),
+        'timestamp': pd.Timestamp.now().isoformat()
+    })
+
+
+ROUTES = {
+    ('POST', '/api/chat'): api_chat,
+    ('POST', '/api/chat/stream'): api_chat_stream,
+    ('GET', '/api/chat/stream'): api_chat_stream,
+    ('POST', '/api/create-po'): api_create_po,
+    ('POST', '/api/validate-invoice'): api_validate_invoice,
+    ('POST', '/api/validate-invoices/batch'): api_validate_invoices_batch,
+    ('POST', '/api/replenishment'): api_replenishment,
+    ('POST', '/api/compare-prices'): api_compare_prices,
+    ('POST', '/api/price-trend'): api_price_trend,
+    ('GET', '/health'): health_check,
+}
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    handler = ROUTES.get((scope['method'], scope['path']))
+    if handler is None:
+        return await send_json(send, {'error': 'Not found'}, 404)
+
+    if scope['method'] == 'GET':
+        query = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+        data = {key: values[0] for key, values in query.items()}
+    elif dict(scope.get('headers', [])).get(b'content-type', b'').startswith(b'text/csv'):
+        data = {'csv': await read_body(receive)}
+    else:
+        try:
+            data = await read_json(receive)
+        except ValueError as e:
+            return await send_json(send, {'error': str(e)}, 400)
+
+    try:
+        await handler(data, send)
+    except Exception as e:
+        await send_json(send, {'error': str(e)}, 500)
+
+
+# ====================== MAIN ======================
+if __name__ == '__main__':
+    import uvicorn
+
+    print("=" * 60)
+    print("🏭 Bio Farma Procurement Assistant - ASGI Server")
+    print("=" * 60)
+    print(f"✅ Agent loaded: {agent_loaded}")
+    print(f"🌐 Starting server on http://localhost:8000")
+    uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,105 @@
+"""
+Memory / latency / recall benchmark for compressed vector storage
+
+Builds the chosen index type with each compression setting (scalar
+quantization, PCA/OPQ reduction, refine re-scoring) and compares it with
+the exact float32 flat baseline on the same corpus and queries.
+
+Usage:
+    python benchmarks/bench_compression.py --source synthetic --n 20000
+    python benchmarks/bench_compression.py --source store --index-type hnsw
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import faiss
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.bench_index import synthetic_vectors, store_vectors, make_queries, recall_at_k, time_queries
+from src.index_factory import INDEX_TYPES, build_index, configure_search, index_memory_bytes
+from src.config import EMBEDDING_DIMENSION, TOP_K_RESULTS, INDEX_REDUCED_DIM
+
+# (quantization, reduction, refine)
+SETTINGS = [
+    ('none', 'none', 'none'),
+    ('fp16', 'none', 'none'),
+    ('int8', 'none', 'none'),
+    ('none', 'pca', 'none'),
+    ('int8', 'pca', 'none'),
+    ('int8', 'opq', 'none'),
+    ('int8', 'pca', 'fp16'),
+    ('int8', 'none', 'flat'),
+]
+
+
+def run_benchmark(vectors, queries, k, index_type, reduced_dim, settings=SETTINGS):
+    """Return one result row per compression setting"""
+    faiss.omp_set_num_threads(1)
+    rows = []
+
+    flat, _ = build_index(vectors, index_type='flat')
+    truth, _ = time_queries(flat, queries, k)
+
+    for quantization, reduction, refine in settings:
+        if index_type == 'ivf_pq' and quantization != 'none':
+            continue
+        start = time.perf_counter()
+        index, params = build_index(
+            vectors, index_type=index_type, quantization=quantization,
+            reduction=reduction, reduced_dim=reduced_dim, refine=refine
+        )
+        build_seconds = time.perf_counter() - start
+        configure_search(index, index_type)
+        memory = index_memory_bytes(index)
+
+        found, latencies = time_queries(index, queries, k)
+        recall = recall_at_k(found, truth)
+        rows.append({
+            'quantization': quantization,
+            'reduction': f"{reduction}{params['reduced_dim']}" if reduction != 'none' else 'none',
+            'refine': refine,
+            'build_seconds': round(build_seconds, 3),
+            'memory_mb': round(memory / 1024 ** 2, 2),
+            'bytes_per_vector': round(memory / len(vectors)),
+            f'recall@{k}': round(recall, 4),
+            'recall_loss': round(1 - recall, 4),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 3)
+        })
+    return rows
+
+
+def print_rows(rows, k):
+    print(f"{'quant':<6} {'reduction':<10} {'refine':<7} {'build s':>8} {'mem MB':>8} {'B/vec':>7} "
+          f"{f'recall@{k}':>10} {'loss':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        print(f"{row['quantization']:<6} {row['reduction']:<10} {row['refine']:<7} {row['build_seconds']:>8.2f} "
+              f"{row['memory_mb']:>8.2f} {row['bytes_per_vector']:>7} {row[f'recall@{k}']:>10.4f} "
+              f"{row['recall_loss']:>7.4f} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector compression benchmark")
+    parser.add_argument('--source', choices=['synthetic', 'store'], default='synthetic')
+    parser.add_argument('--n', type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument('--dim', type=int, default=EMBEDDING_DIMENSION, help="Synthetic dimension")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=TOP_K_RESULTS)
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default='flat')
+    parser.add_argument('--reduced-dim', type=int, default=INDEX_REDUCED_DIM)
+    args = parser.parse_args()
+
+    if args.source == 'store':
+        vectors = store_vectors()
+    else:
+        vectors = synthetic_vectors(args.n, args.dim)
+    queries = make_queries(vectors, args.queries)
+
+    print(f"📊 {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, "
+          f"k={args.k}, index {args.index_type}")
+    rows = run_benchmark(vectors, queries, args.k, args.index_type, args.reduced_dim)
+    print_rows(rows, args.k)
@@ -0,0 +1,81 @@
+"""
+Embedding throughput benchmark against the local stand-in server
+
+Compares the old one-request-at-a-time behaviour (batches of 10, no
+concurrency) with the concurrent BatchEmbedder and reports vectors/second.
+
+Usage:
+    python benchmarks/bench_embeddings.py --texts 2000 --concurrency 8
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+from openai import AzureOpenAI
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.embedding_server import EmbeddingServer
+from src.embedding_pipeline import BatchEmbedder
+from src.config import (
+    AZURE_API_VERSION,
+    AZURE_EMBEDDING_DEPLOYMENT,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_BATCH_MAX_INPUTS
+)
+
+
+def synthetic_texts(n):
+    """Procurement-shaped texts of varying length"""
+    return [
+        f"PURCHASE ORDER\nPO Number: PO-BENCH-{i:05d}\nMaterial Code: RAW-{i % 40:03d}\n"
+        + "Notes: quality check required retest. " * (1 + i % 12)
+        for i in range(n)
+    ]
+
+
+def run(client, texts, label, **options):
+    embedder = BatchEmbedder(client, AZURE_EMBEDDING_DEPLOYMENT, verbose=False, **options)
+    start = time.perf_counter()
+    vectors = embedder.embed(texts)
+    elapsed = time.perf_counter() - start
+    assert len(vectors) == len(texts)
+    print(f"{label:<32} {elapsed:8.2f}s {len(texts) / elapsed:10.1f} vectors/s  retries={embedder.retries}")
+    return len(texts) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding pipeline throughput benchmark")
+    parser.add_argument('--texts', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--max-batch-tokens', type=int, default=EMBEDDING_BATCH_MAX_TOKENS)
+    parser.add_argument('--max-batch-inputs', type=int, default=EMBEDDING_BATCH_MAX_INPUTS)
+    parser.add_argument('--latency', type=float, default=0.1, help="Server seconds per request")
+    parser.add_argument('--per-input-latency', type=float, default=0.002, help="Server seconds per input")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests throttled with 429")
+    args = parser.parse_args()
+
+    server = EmbeddingServer(
+        latency=args.latency,
+        per_input_latency=args.per_input_latency,
+        error_rate=args.error_rate,
+        retry_after=0.2
+    ).start()
+    client = AzureOpenAI(
+        azure_endpoint=server.endpoint,
+        api_key="local",
+        api_version=AZURE_API_VERSION,
+        max_retries=0
+    )
+    texts = synthetic_texts(args.texts)
+
+    print(f"📊 Embedding {len(texts)} texts via {server.endpoint}")
+    baseline = run(client, texts, "sequential, batch_size=10",
+                   concurrency=1, max_batch_inputs=10)
+    pipelined = run(client, texts, f"pipeline, concurrency={args.concurrency}",
+                    concurrency=args.concurrency,
+                    max_batch_tokens=args.max_batch_tokens,
+                    max_batch_inputs=args.max_batch_inputs)
+    print(f"Speed-up: {pipelined / baseline:.1f}x  server={server.stats()}")
+    server.stop()
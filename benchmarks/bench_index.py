@@ -0,0 +1,145 @@
+"""
+Recall / latency / memory benchmark for the FAISS index types
+
+Vectors come either from the built vector store (looked up in the chunk
+embedding cache) or from a synthetic clustered corpus. Every index type is
+compared against the exact flat baseline.
+
+Usage:
+    python benchmarks/bench_index.py --source synthetic --n 50000 --k 5
+    python benchmarks/bench_index.py --source store
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import faiss
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.index_factory import INDEX_TYPES, build_index, configure_search, index_memory_bytes
+from src.config import (
+    VECTOR_STORE_DIR,
+    EMBEDDING_DIMENSION,
+    TOP_K_RESULTS
+)
+
+
+def synthetic_vectors(n, dimension, clusters=64, seed=0):
+    """Gaussian clusters, closer to real embedding geometry than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype('float32')
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.3 * rng.standard_normal((n, dimension)).astype('float32')
+    return vectors.astype('float32')
+
+
+def store_vectors():
+    """Vectors of the current store, read back from the chunk embedding cache"""
+    from src.cache import ChunkEmbeddingCache
+    from src.vector_store import ChunkStore, current_store_dir
+    from src.providers import embedding_deployment
+
+    store = ChunkStore(current_store_dir(VECTOR_STORE_DIR))
+    cache = ChunkEmbeddingCache(embedding_deployment())
+    chunks = list(store.chunks)
+    found = cache.get_many(chunks)
+    missing = sum(1 for chunk in chunks if cache.key(chunk) not in found)
+    if missing:
+        raise RuntimeError(f"{missing} chunks have no cached embedding. Rebuild with embeddings.py first!")
+    return np.stack([found[cache.key(chunk)] for chunk in chunks]).astype('float32')
+
+
+def make_queries(vectors, n_queries, seed=1):
+    """Perturbed corpus vectors, so every query has true near neighbours"""
+    rng = np.random.default_rng(seed)
+    base = vectors[rng.integers(0, len(vectors), size=n_queries)]
+    scale = 0.05 * np.linalg.norm(base, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    return (base + scale * rng.standard_normal(base.shape)).astype('float32')
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def time_queries(index, queries, k):
+    """Per-query latency (single-vector searches, as in RAGEngine.retrieve)"""
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies)
+
+
+def run_benchmark(vectors, queries, k, index_types, nprobes, ef_searches, build_options=None):
+    """Return one result row per (index type, search setting)"""
+    faiss.omp_set_num_threads(1)
+    rows = []
+
+    flat, _ = build_index(vectors, index_type='flat')
+    truth, _ = time_queries(flat, queries, k)
+
+    for index_type in index_types:
+        start = time.perf_counter()
+        index, params = build_index(vectors, index_type=index_type, **(build_options or {}))
+        build_seconds = time.perf_counter() - start
+        memory = index_memory_bytes(index)
+
+        if index_type in ('ivf_flat', 'ivf_pq'):
+            settings = [{'nprobe': n} for n in nprobes]
+        elif index_type == 'hnsw':
+            settings = [{'ef_search': ef} for ef in ef_searches]
+        else:
+            settings = [{}]
+
+        for setting in settings:
+            configure_search(index, index_type, **setting)
+            found, latencies = time_queries(index, queries, k)
+            rows.append({
+                'index_type': index_type,
+                'params': params,
+                'search': setting,
+                'build_seconds': round(build_seconds, 3),
+                'memory_mb': round(memory / 1024 ** 2, 2),
+                f'recall@{k}': round(recall_at_k(found, truth), 4),
+                'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+                'p95_ms': round(float(np.percentile(latencies, 95)), 3)
+            })
+    return rows
+
+
+def print_rows(rows, k):
+    print(f"{'index':<10} {'search':<16} {'build s':>8} {'mem MB':>8} {f'recall@{k}':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        search = ",".join(f"{key}={value}" for key, value in row['search'].items()) or "-"
+        print(f"{row['index_type']:<10} {search:<16} {row['build_seconds']:>8.2f} {row['memory_mb']:>8.2f} "
+              f"{row[f'recall@{k}']:>10.4f} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FAISS index type benchmark")
+    parser.add_argument('--source', choices=['synthetic', 'store'], default='synthetic')
+    parser.add_argument('--n', type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument('--dim', type=int, default=EMBEDDING_DIMENSION, help="Synthetic dimension")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=TOP_K_RESULTS)
+    parser.add_argument('--index-types', nargs='+', choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[16, 64, 128])
+    args = parser.parse_args()
+
+    if args.source == 'store':
+        vectors = store_vectors()
+    else:
+        vectors = synthetic_vectors(args.n, args.dim)
+    queries = make_queries(vectors, args.queries)
+
+    print(f"📊 {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    rows = run_benchmark(vectors, queries, args.k, args.index_types, args.nprobe, args.ef_search)
+    print_rows(rows, args.k)
@@ -0,0 +1,91 @@
+"""
+Per-call latency of single-entity lookups against table size
+
+The sample invoices and purchase orders are replicated with fresh keys up
+to each size; every size is timed with the old boolean-mask scan and with
+the hash indexes of ProcurementDataStore, for the raw row lookup and for
+the full InvoiceValidator.validate / PriceComparator.compare_suppliers call.
+
+Usage:
+    python benchmarks/bench_lookups.py
+    python benchmarks/bench_lookups.py --sizes 1000 100000 1000000 --calls 200
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_store import get_data_store, ProcurementDataStore
+from use_cases.validate_invoice import InvoiceValidator
+from use_cases.price_comparison import PriceComparator
+
+
+def scaled_tables(base, size):
+    """Sample tables with invoices and POs replicated to `size` rows, unique keys"""
+    repeats = -(-size // len(base['invoices']))
+    invoices = pd.concat([base['invoices']] * repeats, ignore_index=True).iloc[:size].copy()
+    pos = pd.concat([base['purchase_orders']] * repeats, ignore_index=True).iloc[:size].copy()
+    invoices['invoice_number'] = [f"INV-{i:08d}" for i in range(size)]
+    invoices['po_number'] = [f"PO-{i % len(pos):08d}" for i in range(size)]
+    pos['po_number'] = [f"PO-{i:08d}" for i in range(len(pos))]
+    tables = dict(base)
+    tables['invoices'] = invoices
+    tables['purchase_orders'] = pos
+    return tables
+
+
+def per_call_us(fn, keys):
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def run_benchmark(sizes, calls, seed=0):
+    base = get_data_store().tables
+    rng = np.random.default_rng(seed)
+    rows = []
+    for size in sizes:
+        store = ProcurementDataStore(tables=scaled_tables(base, size))
+        invoices = store['invoices']
+        pos = store['purchase_orders']
+        keys = invoices['invoice_number'].to_numpy()[rng.integers(0, size, calls)].tolist()
+        materials = pos['material_code'].to_numpy()[rng.integers(0, size, calls)].tolist()
+
+        validator = InvoiceValidator(store)
+        comparator = PriceComparator(store)
+        rows.append({
+            'rows': size,
+            'scan_lookup_us': per_call_us(lambda k: invoices[invoices['invoice_number'] == k].iloc[0], keys),
+            'hash_lookup_us': per_call_us(lambda k: store.get('invoices', k), keys),
+            'scan_group_us': per_call_us(lambda m: pos[pos['material_code'] == m], materials),
+            'hash_group_us': per_call_us(lambda m: store.group('purchase_orders', m), materials),
+            'validate_us': per_call_us(validator.validate, keys),
+            'compare_suppliers_us': per_call_us(comparator.compare_suppliers, materials[:max(1, calls // 10)]),
+        })
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'rows':>10} {'scan get':>10} {'hash get':>10} {'scan group':>11} {'hash group':>11} "
+          f"{'validate':>10} {'compare':>10}   (µs per call)")
+    for row in rows:
+        print(f"{row['rows']:>10} {row['scan_lookup_us']:>10.1f} {row['hash_lookup_us']:>10.1f} "
+              f"{row['scan_group_us']:>11.1f} {row['hash_group_us']:>11.1f} "
+              f"{row['validate_us']:>10.1f} {row['compare_suppliers_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Use-case lookup latency vs table size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--calls', type=int, default=200, help="Lookups timed per size")
+    args = parser.parse_args()
+
+    print(f"📊 {args.calls} random lookups per table size")
+    print_rows(run_benchmark(args.sizes, args.calls))
+    print("\nGroup lookups return every PO of the material, so they still grow with the group size.")
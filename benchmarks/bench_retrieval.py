@@ -0,0 +1,225 @@
+"""
+Retrieval quality and latency benchmark
+
+Generates labelled queries from the raw CSVs, each answered by exactly one
+document (e.g. "unit price on PO-2024-017" -> PO-2024-017.txt), runs them
+through RAGEngine and reports recall@k, MRR, latency percentiles and
+throughput, overall and per source / query kind. 'identifier' queries name
+the record's ID (exact lookup path); 'descriptive' ones only describe it
+(BM25 + dense path). contracts.csv and price_history.csv have no documents
+in the store and are not used.
+
+Runs offline on the local provider by default. Results are saved as JSON;
+pass --baseline with an earlier file to print the deltas.
+
+Usage:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --build --index-type hnsw --baseline data/benchmarks/retrieval-....json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+K_VALUES = [1, 3, 5, 10]
+
+# source -> (csv, id column, [(kind, template)]); templates are filled from the CSV row
+QUERY_TEMPLATES = {
+    'materials': ('materials.csv', 'material_code', [
+        ('identifier', "What is the reorder point for {material_code}?"),
+        ('identifier', "Current stock of {material_code}"),
+        ('descriptive', "What is the storage condition for {material_name}?"),
+        ('descriptive', "How many suppliers do we have for {material_name} ({subcategory})?"),
+    ]),
+    'suppliers': ('suppliers.csv', 'supplier_id', [
+        ('identifier', "What is the rating of supplier {supplier_id}?"),
+        ('identifier', "Payment terms for {supplier_id}"),
+        ('descriptive', "Quality certification and defect rate of {supplier_name}"),
+        ('descriptive', "Who is the contact person at {supplier_name} in {city}?"),
+    ]),
+    'purchase_orders': ('purchase_orders.csv', 'po_number', [
+        ('identifier', "Unit price on {po_number}"),
+        ('identifier', "Who approved {po_number}?"),
+        ('descriptive', "Purchase order dated {po_date} for {quantity} {unit} of {material_name} from {supplier_name}"),
+    ]),
+    'invoices': ('invoices.csv', 'invoice_number', [
+        ('identifier', "Payment status of {invoice_number}"),
+        ('identifier', "Is there a discrepancy on {invoice_number}?"),
+        ('descriptive', "Invoice dated {invoice_date} from {supplier_name} for {quantity_invoiced} {unit} of {line_item_description}"),
+    ]),
+}
+
+
+def generate_queries(raw_dir, per_source=50, seed=0):
+    """
+    Labelled queries from the raw CSVs
+
+    Returns:
+        [{'query', 'relevant' (document filename), 'source', 'kind'}]
+    """
+    rng = random.Random(seed)
+    queries = []
+    for source, (csv_name, id_column, templates) in QUERY_TEMPLATES.items():
+        df = pd.read_csv(Path(raw_dir) / csv_name)
+        rows = df.to_dict('records')
+        rng.shuffle(rows)
+        for i, row in enumerate(rows[:per_source]):
+            kind, template = templates[i % len(templates)]
+            queries.append({
+                'query': template.format(**row),
+                'relevant': f"{row[id_column]}.txt",
+                'source': source,
+                'kind': kind
+            })
+    return queries
+
+
+def relevant_rank(docs, relevant):
+    """1-based rank of the first chunk from the relevant document, or None"""
+    for rank, doc in enumerate(docs, 1):
+        if doc['metadata']['filename'] == relevant:
+            return rank
+    return None
+
+
+def summarize(results, k_values, wall_seconds=None):
+    ranks = [result['rank'] for result in results]
+    latencies = np.array([result['latency_ms'] for result in results])
+    summary = {'queries': len(results)}
+    for k in k_values:
+        summary[f'recall@{k}'] = round(sum(1 for r in ranks if r is not None and r <= k) / len(ranks), 4)
+    summary['mrr'] = round(sum(1 / r for r in ranks if r is not None) / len(ranks), 4)
+    for p in (50, 95, 99):
+        summary[f'p{p}_ms'] = round(float(np.percentile(latencies, p)), 3)
+    if wall_seconds is not None:
+        summary['throughput_qps'] = round(len(results) / wall_seconds, 1)
+    return summary
+
+
+def run_benchmark(engine, queries, k, concurrency=1):
+    """Retrieve every query once (query cache cleared first) and score the ranks"""
+    engine.query_cache.clear()
+
+    def run_one(item):
+        start = time.perf_counter()
+        docs = engine.retrieve(item['query'], k=k)
+        latency = (time.perf_counter() - start) * 1000
+        return dict(item, rank=relevant_rank(docs, item['relevant']), latency_ms=round(latency, 3),
+                    matches=[doc['match'] for doc in docs])
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(run_one, queries))
+    else:
+        results = [run_one(item) for item in queries]
+    wall_seconds = time.perf_counter() - start
+
+    k_values = [value for value in K_VALUES if value <= k]
+    groups = {}
+    for result in results:
+        groups.setdefault(f"source={result['source']}", []).append(result)
+        groups.setdefault(f"kind={result['kind']}", []).append(result)
+    return {
+        'overall': summarize(results, k_values, wall_seconds),
+        'groups': {name: summarize(group, k_values) for name, group in sorted(groups.items())},
+        'queries': results
+    }
+
+
+def print_report(report, baseline=None):
+    k_keys = [key for key in report['overall'] if key.startswith('recall@')]
+    columns = k_keys + ['mrr', 'p50_ms', 'p95_ms', 'p99_ms']
+    print(f"{'group':<26} {'n':>5}" + "".join(f" {key:>10}" for key in columns))
+    rows = [('overall', report['overall'])] + list(report['groups'].items())
+    for name, row in rows:
+        print(f"{name:<26} {row['queries']:>5}" + "".join(f" {row[key]:>10}" for key in columns))
+    print(f"\n⚡ Throughput: {report['overall']['throughput_qps']} queries/s "
+          f"(concurrency {report['settings']['concurrency']})")
+
+    if baseline is not None:
+        print(f"\n📈 Change vs baseline ({baseline['settings'].get('timestamp', '?')}):")
+        for key in columns + ['throughput_qps']:
+            old = baseline['overall'].get(key)
+            new = report['overall'][key]
+            if old is not None:
+                print(f"   {key:<16} {old:>10} -> {new:<10} ({new - old:+.4g})")
+
+
+def settings_snapshot(engine, args):
+    """The knobs a run depends on, saved with its results"""
+    from src import config
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'provider': config.LLM_PROVIDER,
+        'store_version': engine.version,
+        'index_type': engine.snapshot.index_type,
+        'chunks': len(engine.chunks),
+        'k': args.k,
+        'per_source': args.per_source,
+        'seed': args.seed,
+        'concurrency': args.concurrency,
+        'top_k_results': config.TOP_K_RESULTS,
+        'chunk_max_tokens': config.CHUNK_MAX_TOKENS,
+        'chunk_overlap_tokens': config.CHUNK_OVERLAP_TOKENS,
+        'hybrid_retrieval': config.HYBRID_RETRIEVAL,
+        'hybrid_candidates': config.HYBRID_CANDIDATES,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrieval quality and latency benchmark")
+    parser.add_argument('--k', type=int, default=10, help="Results retrieved per query")
+    parser.add_argument('--per-source', type=int, default=50, help="Queries generated per CSV")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--provider', choices=['local', 'azure'], default='local')
+    parser.add_argument('--build', action='store_true', help="Rebuild documents and vector store first")
+    parser.add_argument('--index-type', help="Index type for --build (default: INDEX_TYPE)")
+    parser.add_argument('--output', help="Results JSON (default: data/benchmarks/retrieval-<time>.json)")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    # Must be set before src.config is imported; benchmark queries stay out of the trace log
+    os.environ["LLM_PROVIDER"] = args.provider
+    os.environ.setdefault("TRACE_ENABLED", "false")
+
+    from src.config import RAW_DATA_DIR, DATA_DIR, INDEX_TYPE
+    from src.rag_engine import RAGEngine
+
+    if args.build:
+        from src.data_processor import DataProcessor
+        from src.embeddings import EmbeddingManager
+        DataProcessor().process_all()
+        EmbeddingManager().create_vector_store(args.index_type or INDEX_TYPE)
+
+    engine = RAGEngine()
+    queries = generate_queries(RAW_DATA_DIR, args.per_source, args.seed)
+    print(f"📊 {len(queries)} labelled queries, k={args.k}, store {engine.version}")
+
+    report = {'settings': None}
+    report.update(run_benchmark(engine, queries, args.k, args.concurrency))
+    report['settings'] = settings_snapshot(engine, args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = Path(args.output) if args.output else (
+        DATA_DIR / "benchmarks" / f"retrieval-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\n💾 Saved results to {output}")
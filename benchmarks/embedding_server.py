@@ -0,0 +1,145 @@
+"""
+Local stand-in for the Azure OpenAI embeddings endpoint
+
+Speaks the same wire format as
+POST /openai/deployments/<deployment>/embeddings, returns deterministic
+vectors and can inject latency and 429s, so the indexing pipeline can be
+benchmarked without the live service.
+
+Run standalone:
+    python benchmarks/embedding_server.py --port 8089 --latency 0.2
+"""
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import EMBEDDING_DIMENSION
+
+
+def fake_embedding(text, dimension=EMBEDDING_DIMENSION):
+    """Deterministic unit vector seeded by the text hash"""
+    seed = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:16], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype('float32')
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class EmbeddingHandler(BaseHTTPRequestHandler):
+    server_version = "LocalEmbeddings/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        # Latency and error injection settings live on the server instance
+        settings = self.server.settings
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.split('?')[0].endswith('/embeddings'):
+            self._send_json(404, {'error': {'message': 'Not found'}})
+            return
+
+        inputs = request.get('input', [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        with self.server.stats_lock:
+            self.server.requests += 1
+
+        if random.random() < settings['error_rate']:
+            with self.server.stats_lock:
+                self.server.throttled += 1
+            self._send_json(
+                429,
+                {'error': {'code': '429', 'message': 'Rate limit exceeded'}},
+                headers={'Retry-After': str(settings['retry_after'])}
+            )
+            return
+
+        time.sleep(settings['latency'] + settings['per_input_latency'] * len(inputs))
+
+        data = [
+            {'object': 'embedding', 'index': i, 'embedding': fake_embedding(text, settings['dimension'])}
+            for i, text in enumerate(inputs)
+        ]
+        tokens = sum(len(text.split()) for text in inputs)
+        self._send_json(200, {
+            'object': 'list',
+            'data': data,
+            'model': request.get('model', 'local'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+        })
+
+
+class EmbeddingServer:
+    """Threaded HTTP server running in the background"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, per_input_latency=0.001,
+                 error_rate=0.0, retry_after=0.5, dimension=EMBEDDING_DIMENSION):
+        self.httpd = ThreadingHTTPServer((host, port), EmbeddingHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.settings = {
+            'latency': latency,
+            'per_input_latency': per_input_latency,
+            'error_rate': error_rate,
+            'retry_after': retry_after,
+            'dimension': dimension
+        }
+        self.httpd.requests = 0
+        self.httpd.throttled = 0
+        self.httpd.stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        return {'requests': self.httpd.requests, 'throttled': self.httpd.throttled}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in embedding server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds per request")
+    parser.add_argument('--per-input-latency', type=float, default=0.001, help="Extra seconds per input")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = EmbeddingServer(args.host, args.port, args.latency, args.per_input_latency, args.error_rate)
+    print(f"🧪 Local embedding server on {server.endpoint}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,43 +1,58 @@
 import sys
+import asyncio
 from pathlib import Path
-from openai import AzureOpenAI
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.rag_engine import RAGEngine
+from src.providers import create_client, chat_deployment
+from src.context_builder import ContextBuilder
+from src.cache import AnswerCache
+from src.intent_router import IntentRouter
+from src.tracing import traced, start_trace, usage_dict, annotate
 from src.config import (
-    AZURE_OPENAI_ENDPOINT,
-    AZURE_OPENAI_KEY,
-    AZURE_OPENAI_DEPLOYMENT,
-    AZURE_API_VERSION,
     TEMPERATURE,
-    MAX_TOKENS
+    MAX_TOKENS,
+    TOP_K_RESULTS,
+    ANSWER_CACHE_ENABLED,
+    INTENT_ROUTER_ENABLED,
+    INTENT_ROUTER_LLM_FORMAT
 )
 
 class ProcurementAgent:
-    def __init__(self):
-        self.client = AzureOpenAI(
-            azure_endpoint=AZURE_OPENAI_ENDPOINT,
-            api_key=AZURE_OPENAI_KEY,
-            api_version=AZURE_API_VERSION
+    def __init__(self, client=None, async_client=None, router=None):
+        self.client = client or create_client()
+        self.rag_engine = RAGEngine(client=self.client, async_client=async_client)
+        self.deployment = chat_deployment()
+        self.context_builder = ContextBuilder()
+        self.answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
+        self.router = router or (IntentRouter() if INTENT_ROUTER_ENABLED else None)
+    
+    @property
+    def async_client(self):
+        """Async client shared with the retrieval engine, created on first use"""
+        return self.rag_engine.async_client
+    
+    def _answer_key(self, user_question, relevant_docs):
+        """Answer cache key for this question and evidence, or None when caching is off"""
+        if self.answer_cache is None:
+            return None
+        self.answer_cache.ensure_version(self.rag_engine.version)
+        # Key on the version the docs came from: a reload may have happened mid-query
+        store_version = relevant_docs[0]['store_version'] if relevant_docs else self.rag_engine.version
+        return self.answer_cache.key(
+            user_question,
+            [doc['chunk_id'] for doc in relevant_docs],
+            self.deployment,
+            store_version
         )
-        self.rag_engine = RAGEngine()
-        self.deployment = AZURE_OPENAI_DEPLOYMENT
     
-    def query(self, user_question, context_type="general"):
-        """
-        Main query method
-        
-        Args:
-            user_question: User's question
-            context_type: Type of context needed
-        """
-        # Retrieve relevant documents
-        relevant_docs = self.rag_engine.retrieve(user_question, k=5)
-        
-        # Build context from retrieved documents
-        context = "\n\n".join([doc['content'] for doc in relevant_docs])
+    def build_messages(self, user_question, relevant_docs):
+        """Assemble the chat messages for a question and its retrieved documents"""
+        # Build context: one block per source, relevant sections only, within the token budget
+        context, stats = self.context_builder.build(user_question, relevant_docs)
+        annotate(context_tokens=stats['context_tokens'], context_sources=len(stats['sources']))
         
         # Create system prompt
         system_prompt = f"""You are a Procurement Assistant for Bio Farma, an Indonesian pharmaceutical company.
@@ -58,16 +73,251 @@ Guidelines:
 - Flag any discrepancies or issues
 - Be concise but thorough
 """
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_question}
+        ]
+    
+    def route(self, user_question):
+        """Use-case answer for a structured question, or None to go through retrieval"""
+        if self.router is None:
+            return None
+        return self.router.route(user_question)
+    
+    def query(self, user_question, context_type="general"):
+        """
+        Main query method
         
-        # Call Azure OpenAI
-        response = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_question}
-            ],
-            temperature=TEMPERATURE,
-            max_tokens=MAX_TOKENS
-        )
+        Args:
+            user_question: User's question
+            context_type: Type of context needed
+        """
+        with traced('chat', question=user_question) as trace:
+            # Structured questions are answered by the use cases directly
+            with trace.stage('route'):
+                routed = self.route(user_question)
+            if routed is not None:
+                trace.set(intent=routed.intent)
+                if not INTENT_ROUTER_LLM_FORMAT:
+                    return routed.text
+                with trace.stage('completion'):
+                    response = self.client.chat.completions.create(
+                        model=self.deployment,
+                        messages=self.router.format_messages(user_question, routed),
+                        temperature=TEMPERATURE,
+                        max_tokens=MAX_TOKENS
+                    )
+                trace.set(usage=usage_dict(response))
+                return response.choices[0].message.content
+            
+            # Retrieve relevant documents
+            relevant_docs = self.rag_engine.retrieve(user_question, k=TOP_K_RESULTS)
+            
+            # Same question over the same evidence: reuse the previous answer
+            cache_key = self._answer_key(user_question, relevant_docs)
+            if cache_key is not None:
+                with trace.stage('answer_cache'):
+                    cached = self.answer_cache.get(cache_key)
+                trace.set(answer_cache_hit=cached is not None)
+                if cached is not None:
+                    return cached
+            
+            with trace.stage('prompt'):
+                messages = self.build_messages(user_question, relevant_docs)
+            
+            # Call Azure OpenAI
+            with trace.stage('completion'):
+                response = self.client.chat.completions.create(
+                    model=self.deployment,
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    max_tokens=MAX_TOKENS
+                )
+            trace.set(usage=usage_dict(response))
+            
+            answer = response.choices[0].message.content
+            if cache_key is not None and answer:
+                self.answer_cache.set(cache_key, answer)
+            return answer
+    
+    def query_stream(self, user_question, context_type="general"):
+        """
+        Streaming variant of query: yields text fragments as the model produces them
         
-        return response.choices[0].message.content
\ No newline at end of file
+        Args:
+            user_question: User's question
+            context_type: Type of context needed
+        """
+        # Activated only around calls, never across a yield
+        trace = start_trace('chat_stream', question=user_question)
+        try:
+            with trace.activate(), trace.stage('route'):
+                routed = self.route(user_question)
+            if routed is not None:
+                trace.set(intent=routed.intent)
+            if routed is not None and not INTENT_ROUTER_LLM_FORMAT:
+                yield routed.text
+                return
+            
+            if routed is not None:
+                cache_key = None
+                messages = self.router.format_messages(user_question, routed)
+            else:
+                with trace.activate():
+                    relevant_docs = self.rag_engine.retrieve(user_question, k=TOP_K_RESULTS)
+                
+                cache_key = self._answer_key(user_question, relevant_docs)
+                if cache_key is not None:
+                    with trace.stage('answer_cache'):
+                        cached = self.answer_cache.get(cache_key)
+                    trace.set(answer_cache_hit=cached is not None)
+                    if cached is not None:
+                        yield cached
+                        return
+                
+                with trace.activate(), trace.stage('prompt'):
+                    messages = self.build_messages(user_question, relevant_docs)
+            
+            completion_start = trace.elapsed_ms()
+            stream = self.client.chat.completions.create(
+                model=self.deployment,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            
+            parts = []
+            for chunk in stream:
+                # Azure sends content-filter chunks, and the final usage chunk, with no choices
+                if getattr(chunk, 'usage', None) is not None:
+                    trace.set(usage=usage_dict(chunk))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        trace.add_stage('first_token', trace.elapsed_ms() - completion_start)
+                    parts.append(delta)
+                    yield delta
+            trace.add_stage('completion', trace.elapsed_ms() - completion_start)
+            
+            # Only a fully received answer is cached
+            if cache_key is not None and parts:
+                self.answer_cache.set(cache_key, "".join(parts))
+        except Exception as e:
+            trace.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            trace.finish()
+    
+    async def aquery(self, user_question, context_type="general"):
+        """Async counterpart of query, for callers running on an event loop"""
+        with traced('chat', question=user_question) as trace:
+            # The use cases are pandas-bound; keep them off the event loop
+            with trace.stage('route'):
+                routed = await asyncio.to_thread(self.route, user_question)
+            if routed is not None:
+                trace.set(intent=routed.intent)
+                if not INTENT_ROUTER_LLM_FORMAT:
+                    return routed.text
+                with trace.stage('completion'):
+                    response = await self.async_client.chat.completions.create(
+                        model=self.deployment,
+                        messages=self.router.format_messages(user_question, routed),
+                        temperature=TEMPERATURE,
+                        max_tokens=MAX_TOKENS
+                    )
+                trace.set(usage=usage_dict(response))
+                return response.choices[0].message.content
+            
+            relevant_docs = await self.rag_engine.aretrieve(user_question, k=TOP_K_RESULTS)
+            
+            cache_key = self._answer_key(user_question, relevant_docs)
+            if cache_key is not None:
+                with trace.stage('answer_cache'):
+                    cached = self.answer_cache.get(cache_key)
+                trace.set(answer_cache_hit=cached is not None)
+                if cached is not None:
+                    return cached
+            
+            with trace.stage('prompt'):
+                messages = self.build_messages(user_question, relevant_docs)
+            
+            with trace.stage('completion'):
+                response = await self.async_client.chat.completions.create(
+                    model=self.deployment,
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    max_tokens=MAX_TOKENS
+                )
+            trace.set(usage=usage_dict(response))
+            
+            answer = response.choices[0].message.content
+            if cache_key is not None and answer:
+                self.answer_cache.set(cache_key, answer)
+            return answer
+    
+    async def aquery_stream(self, user_question, context_type="general"):
+        """Async counterpart of query_stream: an async generator of text fragments"""
+        trace = start_trace('chat_stream', question=user_question)
+        try:
+            with trace.activate(), trace.stage('route'):
+                routed = await asyncio.to_thread(self.route, user_question)
+            if routed is not None:
+                trace.set(intent=routed.intent)
+            if routed is not None and not INTENT_ROUTER_LLM_FORMAT:
+                yield routed.text
+                return
+            
+            if routed is not None:
+                cache_key = None
+                messages = self.router.format_messages(user_question, routed)
+            else:
+                with trace.activate():
+                    relevant_docs = await self.rag_engine.aretrieve(user_question, k=TOP_K_RESULTS)
+                
+                cache_key = self._answer_key(user_question, relevant_docs)
+                if cache_key is not None:
+                    with trace.stage('answer_cache'):
+                        cached = self.answer_cache.get(cache_key)
+                    trace.set(answer_cache_hit=cached is not None)
+                    if cached is not None:
+                        yield cached
+                        return
+                
+                with trace.activate(), trace.stage('prompt'):
+                    messages = self.build_messages(user_question, relevant_docs)
+            
+            completion_start = trace.elapsed_ms()
+            stream = await self.async_client.chat.completions.create(
+                model=self.deployment,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            
+            parts = []
+            async for chunk in stream:
+                if getattr(chunk, 'usage', None) is not None:
+                    trace.set(usage=usage_dict(chunk))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        trace.add_stage('first_token', trace.elapsed_ms() - completion_start)
+                    parts.append(delta)
+                    yield delta
+            trace.add_stage('completion', trace.elapsed_ms() - completion_start)
+            
+            if cache_key is not None and parts:
+                self.answer_cache.set(cache_key, "".join(parts))
+        except Exception as e:
+            trace.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            trace.finish()
@@ -0,0 +1,82 @@
+"""
+Micro-batching of concurrent requests
+
+Callers block on submit(); a background thread gathers whatever arrives
+within a short window and hands the whole batch to one handler call. If
+that call fails, the items are retried one by one, so only the callers
+whose own item fails get the exception.
+"""
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, handler, max_batch_size=32, max_wait_ms=10):
+        """
+        Args:
+            handler: Callable taking a list of items and returning a list
+                of results in the same order
+            max_batch_size: Flush as soon as this many items are waiting
+            max_wait_ms: Longest time the first item of a batch waits for company
+        """
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue an item and block until its batch has been handled"""
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    self._run_each(batch)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _run_each(self, batch):
+        """Fallback after a failed batch: one handler call per item"""
+        for item, future in batch:
+            try:
+                future.set_result(self.handler([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0
+        }
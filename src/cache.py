@@ -0,0 +1,361 @@
+"""
+Caching primitives for the RAG pipeline
+In-process LRU in front of a SQLite store on disk
+"""
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import (
+    CACHE_DIR,
+    QUERY_CACHE_MEMORY_SIZE,
+    QUERY_CACHE_DISK_SIZE,
+    QUERY_CACHE_TTL_SECONDS,
+    CHUNK_CACHE_PATH,
+    CHUNK_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_MEMORY_SIZE,
+    ANSWER_CACHE_DISK_SIZE,
+    ANSWER_CACHE_TTL_SECONDS
+)
+
+
+def normalize_query(text):
+    """Lowercase and collapse whitespace so trivially different questions share a key"""
+    return " ".join(str(text).split()).lower()
+
+
+def make_key(*parts):
+    """Stable hash key from string parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with optional TTL"""
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, created = entry
+            if self.ttl is not None and time.time() - created > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    """SQLite-backed key/blob store shared between processes"""
+
+    def __init__(self, path, max_entries=50_000, ttl=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys present; ignores TTL-expired rows"""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created FROM entries WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, value, created in rows:
+                    if self.ttl is None or now - created <= self.ttl:
+                        found[key] = value
+                self._conn.execute(
+                    f"UPDATE entries SET accessed = ? WHERE key IN ({placeholders})",
+                    [now] + list(batch)
+                )
+            self._conn.commit()
+        return found
+
+    def set_many(self, items):
+        """Insert or replace (key, value) pairs in a single transaction"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in items]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._writes += 1
+            # Evicting on every write would turn each set into a table scan
+            if self._writes % 100 == 0:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop expired rows, then the least recently used rows above max_entries"""
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+        if self.max_entries is None:
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache for query embeddings
+
+    Keys are the normalized query text plus the embedding deployment name,
+    so switching deployments never serves vectors from a different model.
+    """
+
+    def __init__(self, deployment, memory_size=QUERY_CACHE_MEMORY_SIZE,
+                 disk_size=QUERY_CACHE_DISK_SIZE, ttl=QUERY_CACHE_TTL_SECONDS,
+                 disk_path=None):
+        self.deployment = deployment
+        self.memory = LRUCache(max_size=memory_size, ttl=ttl)
+        self.disk = DiskCache(
+            disk_path or CACHE_DIR / "query_embeddings.sqlite",
+            max_entries=disk_size,
+            ttl=ttl
+        )
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text):
+        return make_key(self.deployment, normalize_query(text))
+
+    def get(self, text):
+        """Return cached embedding as float32 array, or None"""
+        key = self._key(text)
+
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector
+
+        blob = self.disk.get(key)
+        if blob is not None:
+            vector = np.frombuffer(blob, dtype='float32')
+            self.memory.set(key, vector)
+            self.disk_hits += 1
+            return vector
+
+        self.misses += 1
+        return None
+
+    def set(self, text, embedding):
+        key = self._key(text)
+        vector = np.asarray(embedding, dtype='float32')
+        self.memory.set(key, vector)
+        self.disk.set(key, vector.tobytes())
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        """Hit/miss counters for both tiers"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.disk)
+        }
+
+
+class AnswerCache:
+    """
+    Two-tier cache for agent answers
+
+    Keys combine the normalized question, the ordered IDs of the retrieved
+    chunks, the chat deployment and the vector store version. Entries from
+    an older store version are dropped the first time a new version is seen.
+    """
+
+    VERSION_KEY = "__store_version__"
+
+    def __init__(self, memory_size=ANSWER_CACHE_MEMORY_SIZE, disk_size=ANSWER_CACHE_DISK_SIZE,
+                 ttl=ANSWER_CACHE_TTL_SECONDS, disk_path=None):
+        self.memory = LRUCache(max_size=memory_size, ttl=ttl)
+        self.disk = DiskCache(
+            disk_path or CACHE_DIR / "answers.sqlite",
+            max_entries=disk_size,
+            ttl=ttl
+        )
+        self.store_version = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, question, chunk_ids, deployment, store_version):
+        return make_key(
+            normalize_query(question),
+            ",".join(str(chunk_id) for chunk_id in chunk_ids),
+            deployment,
+            store_version
+        )
+
+    def ensure_version(self, store_version):
+        """Invalidate everything cached against a different vector store version"""
+        if store_version == self.store_version:
+            return
+        stored = self.disk.get(self.VERSION_KEY)
+        if stored is not None and stored.decode('utf-8') != store_version:
+            self.clear()
+        self.disk.set(self.VERSION_KEY, store_version.encode('utf-8'))
+        self.store_version = store_version
+
+    def get(self, key):
+        answer = self.memory.get(key)
+        if answer is None:
+            blob = self.disk.get(key)
+            if blob is not None:
+                answer = blob.decode('utf-8')
+                self.memory.set(key, answer)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def set(self, key, answer):
+        self.memory.set(key, answer)
+        self.disk.set(key, answer.encode('utf-8'))
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.disk)
+        }
+
+
+class ChunkEmbeddingCache:
+    """
+    Persistent content-hash -> vector store for document chunks
+
+    A chunk is keyed by the hash of its text and the embedding deployment,
+    so unchanged chunks are reused across rebuilds and edited ones miss.
+    """
+
+    def __init__(self, deployment, path=CHUNK_CACHE_PATH, max_entries=CHUNK_CACHE_MAX_ENTRIES):
+        self.deployment = deployment
+        # A build touches all its chunks (get_many) before inserting new ones,
+        # so LRU eviction drops vectors of edited or deleted chunks first
+        self.disk = DiskCache(path, max_entries=max_entries)
+
+    def key(self, text):
+        return make_key(self.deployment, text)
+
+    def get_many(self, texts):
+        """Return {text_key: float32 vector} for texts already embedded"""
+        keys = list({self.key(text) for text in texts})
+        return {
+            key: np.frombuffer(blob, dtype='float32')
+            for key, blob in self.disk.get_many(keys).items()
+        }
+
+    def set_many(self, texts, embeddings):
+        self.disk.set_many([
+            (self.key(text), np.asarray(embedding, dtype='float32').tobytes())
+            for text, embedding in zip(texts, embeddings)
+        ])
+
+    def __len__(self):
+        return len(self.disk)
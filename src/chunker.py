@@ -0,0 +1,142 @@
+"""
+Record-aware, token-budgeted chunker
+
+DataProcessor writes one record per file as blank-line separated sections
+(title block, SUPPLIER, MATERIAL, FINANCIAL, ...). A record that fits the
+token budget becomes exactly one chunk. Larger records are packed section
+by section, each chunk repeating the title block so it stays attributable,
+and only a section too large on its own is split by tokens with overlap.
+
+Run standalone to compare with the legacy character splitter:
+    python src/chunker.py
+"""
+import sys
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.tokenizer import count_tokens, get_encoding
+from src.config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+# Joins the sections of a chunk; its tokens count against the budget too
+SEPARATOR = "\n\n"
+
+
+class RecordChunker:
+    def __init__(self, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    @staticmethod
+    def sections(text):
+        """Blank-line separated sections, stripped of surrounding whitespace"""
+        blocks = []
+        current = []
+        for line in text.splitlines():
+            if line.strip():
+                current.append(line.rstrip())
+            elif current:
+                blocks.append("\n".join(current))
+                current = []
+        if current:
+            blocks.append("\n".join(current))
+        return blocks
+
+    def _split_tokens(self, text, budget):
+        """Last resort for a single oversized section: token windows with overlap"""
+        encoding = get_encoding()
+        tokens = encoding.encode(text, disallowed_special=())
+        step = max(1, budget - self.overlap_tokens)
+        return [
+            encoding.decode(tokens[start:start + budget])
+            for start in range(0, len(tokens), step)
+            if start == 0 or start + self.overlap_tokens < len(tokens)
+        ]
+
+    def _header(self, title_block):
+        """Title repeated at the top of every chunk after the first, at most a quarter of the budget"""
+        limit = self.max_tokens // 4
+        # A huge title block would crowd out everything else; repeat only its first line
+        header = title_block if count_tokens(title_block) <= limit else title_block.splitlines()[0]
+        if count_tokens(header) > limit:
+            encoding = get_encoding()
+            header = encoding.decode(encoding.encode(header, disallowed_special=())[:limit])
+        return header
+
+    def split(self, text):
+        """Split one record into chunks within the token budget"""
+        text = text.strip()
+        if not text:
+            return []
+        if count_tokens(text) <= self.max_tokens:
+            return [text]
+
+        blocks = self.sections(text)
+        header = self._header(blocks[0])
+        separator_tokens = count_tokens(SEPARATOR)
+        header_tokens = count_tokens(header) + separator_tokens
+        # Room for one block in a chunk that starts with the header
+        budget = self.max_tokens - header_tokens
+
+        chunks = []
+        current = []
+        current_tokens = 0
+        for block in blocks:
+            block_tokens = count_tokens(block)
+            added = block_tokens + (separator_tokens if current else 0)
+            if current_tokens + added <= self.max_tokens:
+                current.append(block)
+                current_tokens += added
+                continue
+
+            if not current:
+                # Oversized title block: it is its own header, so no prefix
+                pieces = self._split_tokens(block, self.max_tokens)
+                chunks.extend(pieces[:-1])
+                current = [pieces[-1]]
+                current_tokens = count_tokens(pieces[-1])
+                continue
+
+            chunks.append(SEPARATOR.join(current))
+            if block_tokens <= budget:
+                current = [header, block]
+                current_tokens = header_tokens + block_tokens
+            else:
+                pieces = self._split_tokens(block, budget)
+                chunks.extend(f"{header}{SEPARATOR}{piece}" for piece in pieces[:-1])
+                current = [header, pieces[-1]]
+                current_tokens = header_tokens + count_tokens(pieces[-1])
+
+        chunks.append(SEPARATOR.join(current))
+        return chunks
+
+
+def chunk_statistics(chunks):
+    """Count and token-size summary of a list of chunks"""
+    tokens = np.array([count_tokens(chunk) for chunk in chunks]) if chunks else np.zeros(1)
+    return {
+        'chunks': len(chunks),
+        'total_tokens': int(tokens.sum()),
+        'mean_tokens': round(float(tokens.mean()), 1),
+        'max_tokens': int(tokens.max()),
+        'under_50_tokens': int((tokens < 50).sum()) if chunks else 0
+    }
+
+
+def print_comparison(before, after):
+    print(f"{'':<16} {'legacy':>10} {'record':>10}")
+    for key in before:
+        print(f"{key:<16} {before[key]:>10} {after[key]:>10}")
+
+
+if __name__ == "__main__":
+    from src.embeddings import EmbeddingManager
+
+    manager = EmbeddingManager()
+    documents, _ = manager.load_documents()
+    legacy = [chunk for doc in documents for chunk in manager.split_text(doc)]
+    chunker = RecordChunker()
+    records = [chunk for doc in documents for chunk in chunker.split(doc)]
+    print_comparison(chunk_statistics(legacy), chunk_statistics(records))
@@ -11,11 +11,13 @@ DATA_DIR = BASE_DIR / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 DOCUMENTS_DIR = DATA_DIR / "documents"
 VECTOR_STORE_DIR = DATA_DIR / "vector_store"
+CACHE_DIR = DATA_DIR / "cache"
 
 # Create directories if they don't exist
 RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
 DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
 VECTOR_STORE_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 # Azure OpenAI Configuration
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT", "")
@@ -24,16 +26,127 @@ AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4.1-mini")
 AZURE_EMBEDDING_DEPLOYMENT = os.getenv("AZURE_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002")
 AZURE_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview")
 
+# Model provider: "azure", or "local" for deterministic offline backends
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "azure")
+LOCAL_EMBEDDING_MODEL = "local-hashing-v1"
+LOCAL_CHAT_MODEL = "local-canned-v1"
+# Artificial latency for the local backends, to model the remote service
+LOCAL_EMBEDDING_LATENCY_MS = float(os.getenv("LOCAL_EMBEDDING_LATENCY_MS", "0"))
+LOCAL_CHAT_LATENCY_MS = float(os.getenv("LOCAL_CHAT_LATENCY_MS", "0"))
+LOCAL_CHAT_TOKEN_LATENCY_MS = float(os.getenv("LOCAL_CHAT_TOKEN_LATENCY_MS", "0"))
+
 # Validate required environment variables
-if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_KEY:
+if LLM_PROVIDER == "azure" and (not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_KEY):
     print("⚠️  WARNING: Azure OpenAI credentials not found in .env file")
 
 # Model settings
 TEMPERATURE = 0.1
 MAX_TOKENS = 1500
 TOP_K_RESULTS = 5
+CONTEXT_TOKEN_BUDGET = 2000  # retrieved context in the system prompt
 EMBEDDING_DIMENSION = 1536  
 
+# Vector index
+# One of: flat, ivf_flat, ivf_pq, hnsw
+INDEX_TYPE = "flat"
+IVF_NLIST = 0  # 0 = derive from corpus size
+IVF_NPROBE = 8
+PQ_M = 64  # must divide EMBEDDING_DIMENSION
+PQ_NBITS = 8
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Vector compression, applied on top of any index type
+INDEX_QUANTIZATION = "none"  # none, fp16 or int8 scalar quantization (not with ivf_pq)
+INDEX_REDUCTION = "none"  # none, pca or opq (rotation + reduction, trained on the corpus)
+INDEX_REDUCED_DIM = 256
+INDEX_REFINE = "none"  # re-score candidates with full vectors: none, flat (float32) or fp16
+INDEX_REFINE_K_FACTOR = 4  # candidates re-scored per requested result
+
+# Hybrid retrieval: exact identifier lookup + BM25 fused with dense search
+HYBRID_RETRIEVAL = True
+HYBRID_CANDIDATES = 20  # per-ranking depth before fusion
+# Identifier fast path: BM25 hits below this score are not used to fill the remaining slots
+LEXICAL_FILL_MIN_SCORE = 1.0
+
+# Vector store loading
+# Memory-map index.faiss read-only instead of reading it into each process
+FAISS_MMAP = False
+
+# Versioned vector store: each build is written to versions/<version> and
+# published by atomically replacing the CURRENT pointer file
+STORE_KEEP_VERSIONS = 3  # published versions kept on disk, CURRENT included
+STORE_RELOAD_INTERVAL_SECONDS = 10  # how often servers check CURRENT for a new build
+
+# Batch embedding pipeline
+EMBEDDING_CONCURRENCY = 4
+EMBEDDING_BATCH_MAX_TOKENS = 16_000
+EMBEDDING_BATCH_MAX_INPUTS = 64
+EMBEDDING_MAX_RETRIES = 6
+
+# Shared LLM client: connection pool, per-call deadlines, retries and hedging
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_KEEPALIVE_CONNECTIONS = 10
+LLM_KEEPALIVE_EXPIRY_SECONDS = 30
+LLM_CONNECT_TIMEOUT_SECONDS = 5
+LLM_EMBEDDING_DEADLINE_SECONDS = 10  # whole call, retries included
+LLM_CHAT_DEADLINE_SECONDS = 60  # until the response (or first stream chunk) arrives
+LLM_MAX_RETRIES = 3
+LLM_RETRY_BUDGET_RATIO = 0.1  # retries earned per request
+LLM_RETRY_BUDGET_RESERVE = 10  # retries available before any are earned
+EMBEDDING_HEDGE_DELAY_MS = 0  # send a second embedding request after this long; 0 = off
+
+# Intent router: structured questions answered by the use cases, not the LLM
+INTENT_ROUTER_ENABLED = True
+INTENT_ROUTER_LLM_FORMAT = False  # True: the LLM phrases the use-case result
+INTENT_ROUTER_MIN_SCORE = 2
+
+# Micro-batching of concurrent retrievals (enabled by the Flask server)
+RETRIEVAL_BATCH_MAX_SIZE = 32
+RETRIEVAL_BATCH_WINDOW_MS = 10
+
+# Chunking (record-aware, sized in tiktoken tokens)
+CHUNK_MAX_TOKENS = 512
+CHUNK_OVERLAP_TOKENS = 50  # only used when a single section exceeds the budget
+
+# Query embedding cache
+QUERY_CACHE_MEMORY_SIZE = 2048
+QUERY_CACHE_DISK_SIZE = 50_000
+QUERY_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+# Answer cache (invalidated whenever the vector store is rebuilt)
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_MEMORY_SIZE = 512
+ANSWER_CACHE_DISK_SIZE = 20_000
+ANSWER_CACHE_TTL_SECONDS = 24 * 3600
+
+# Per-request trace log (JSONL, rotated by size); summarize with src/trace_report.py
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+TRACE_PATH = DATA_DIR / "traces" / "requests.jsonl"
+TRACE_MAX_BYTES = 10 * 1024 * 1024
+TRACE_BACKUP_COUNT = 5
+
+# Chunk embedding cache (reused across vector store rebuilds)
+CHUNK_CACHE_PATH = CACHE_DIR / "chunk_embeddings.sqlite"
+# LRU limit; must stay above the corpus chunk count or live vectors get re-embedded
+CHUNK_CACHE_MAX_ENTRIES = 100_000
+
+# Procurement tables (ProcurementDataStore): how often servers check the raw CSVs for changes
+DATA_REFRESH_INTERVAL_SECONDS = 30
+
+# Supplier ranking for PO suggestions, 0-100:
+# on-time delivery % * ON_TIME_WEIGHT + (100 - defect rate %) * QUALITY_WEIGHT
+SUPPLIER_SCORE_ON_TIME_WEIGHT = 0.6
+SUPPLIER_SCORE_QUALITY_WEIGHT = 0.4
+
+# Replenishment run: materials at or below their reorder point are ordered up to
+# ORDER_UP_TO_FACTOR x max(reorder point, min stock level)
+REPLENISHMENT_ORDER_UP_TO_FACTOR = 2.0
+
+# Bulk invoice validation: rows matched per vectorized chunk (and per streamed batch)
+INVOICE_BATCH_CHUNK_ROWS = 5000
+
 # Approval thresholds (in IDR)
 MANAGER_APPROVAL_LIMIT = 500_000_000
 DIRECTOR_APPROVAL_LIMIT = 1_000_000_000
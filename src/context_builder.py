@@ -0,0 +1,155 @@
+"""
+Token-budgeted context packing for the agent prompt
+
+Retrieved chunks are grouped by source file (so the repeated record header
+and the overlap between consecutive windows of the same record are merged
+instead of repeated), trimmed to the sections the
+question is about, and added in rank order until the token budget is spent.
+"""
+import re
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.tokenizer import count_tokens
+from src.config import CONTEXT_TOKEN_BUDGET
+
+# Section headers written by DataProcessor -> question words that need them
+SECTION_KEYWORDS = {
+    'PRICING & STOCK': r"price|cost|stock|inventory|reorder",
+    'SUPPLY CHAIN': r"lead time|supplier count|number of suppliers|last purchase",
+    'COMPLIANCE': r"gmp|storage|critical|certif|audit|contract|complian",
+    'LOCATION': r"country|city|located|location|tax id",
+    'PERFORMANCE METRICS': r"rating|on-time|on time|defect|performance|spend|best",
+    'TERMS': r"payment terms?|lead time|currency|terms",
+    'CONTACT': r"contact|email|phone",
+    'FINANCIAL': r"price|cost|amount|total|tax|vat|subtotal|value",
+    'LINE ITEM': r"quantit|price|unit|item",
+    'DELIVERY': r"deliver|location|payment terms?",
+    'APPROVAL': r"approv|created|who",
+    'RECEIPT': r"receiv|receipt|goods|3-way|three-way",
+    'PAYMENT': r"pay|due|overdue",
+    'VALIDATION': r"discrepanc|validat|mismatch|match",
+}
+# Sections identifying the parties of a record are always kept
+ALWAYS_KEEP = {'SUPPLIER', 'MATERIAL'}
+# Shortest text shared by consecutive windows that is treated as their overlap
+OVERLAP_MIN_CHARS = 20
+
+
+def relevant_sections(question):
+    """Section headers the question asks about, or None to keep everything"""
+    wanted = {
+        header for header, pattern in SECTION_KEYWORDS.items()
+        if re.search(pattern, question, re.IGNORECASE)
+    }
+    return wanted or None
+
+
+def _overlap(previous, text, min_chars=OVERLAP_MIN_CHARS):
+    """Length of the longest suffix of previous that text starts with (at least min_chars), else 0"""
+    if len(text) < min_chars:
+        return 0
+    start = previous.find(text[:min_chars])
+    while start != -1:
+        if text.startswith(previous[start:]):
+            return len(previous) - start
+        start = previous.find(text[:min_chars], start + 1)
+    return 0
+
+
+def merge_windows(chunks):
+    """
+    Merge the chunks of one source, given as (chunk_id, text), in chunk order
+    
+    Every chunk after the first of a record repeats the record header (see
+    RecordChunker), which is dropped; consecutive windows of a section split
+    by tokens share an overlap, which is kept once. Everything else is kept,
+    including lines that legitimately repeat in different sections.
+    """
+    merged = ""
+    previous_id = None
+    for chunk_id, text in sorted(chunks):
+        text = text.strip()
+        if not merged:
+            merged, previous_id = text, chunk_id
+            continue
+        if chunk_id == previous_id:
+            continue
+        header, _, rest = text.partition("\n\n")
+        if rest and merged.startswith(header):
+            text = rest
+        overlap = _overlap(merged, text) if chunk_id == previous_id + 1 else 0
+        merged = merged + text[overlap:] if overlap else f"{merged}\n\n{text}"
+        previous_id = chunk_id
+    return merged
+
+
+def split_sections(text):
+    return [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
+
+
+class ContextBuilder:
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+
+    def _filter_sections(self, text, wanted):
+        """Keep the title block, party sections and the sections the question needs"""
+        sections = split_sections(text)
+        if wanted is None or len(sections) <= 1:
+            return sections
+        kept = [sections[0]]
+        for section in sections[1:]:
+            header = section.splitlines()[0].strip()
+            if header in ALWAYS_KEEP or header in wanted or header not in SECTION_KEYWORDS:
+                kept.append(section)
+        return kept
+
+    def build(self, question, docs):
+        """
+        Pack retrieved docs into a context string
+
+        Returns:
+            (context, stats) where stats has the token count and the sources used
+        """
+        grouped = {}
+        for doc in docs:
+            grouped.setdefault(doc['metadata']['source'], []).append((doc['chunk_id'], doc['content']))
+
+        wanted = relevant_sections(question)
+        separator_tokens = 2
+        blocks = []
+        used_sources = []
+        tokens = 0
+
+        for source, chunks in grouped.items():
+            remaining = self.token_budget - tokens
+            if remaining <= separator_tokens:
+                break
+            sections = self._filter_sections(merge_windows(chunks), wanted)
+
+            # Add whole sections while they fit; a partial record beats none
+            kept = []
+            kept_tokens = 0
+            for section in sections:
+                section_tokens = count_tokens(section) + separator_tokens
+                if kept_tokens + section_tokens > remaining:
+                    break
+                kept.append(section)
+                kept_tokens += section_tokens
+            if not kept:
+                continue
+
+            blocks.append("\n\n".join(kept))
+            used_sources.append(source)
+            tokens += kept_tokens
+
+        context = "\n\n---\n\n".join(blocks)
+        return context, {
+            'context_tokens': count_tokens(context),
+            'sources': used_sources,
+            'chunks_in': len(docs),
+            'sections_filter': sorted(wanted) if wanted else None
+        }
@@ -0,0 +1,296 @@
+"""
+Shared in-memory procurement tables for the use cases
+
+ProcurementDataStore parses every CSV in RAW_DATA_DIR once, with explicit
+compact dtypes: categoricals for repeated names, codes and statuses,
+datetime64 for dates, int32 for quantities, unit prices and day counts
+(IDR totals stay int64). POCreator, InvoiceValidator and PriceComparator
+take the store as a constructor argument and default to the process-wide
+get_data_store(), so each table lives in memory once.
+
+Single-entity lookups go through hash indexes built at load time instead
+of boolean-mask scans: get() maps a primary key (invoice, PO, material,
+supplier) to its row, group() a material_code to its PO or price-history
+rows, both O(1) in the table size.
+
+refresh() reloads tables whose CSV changed on disk (start_auto_refresh()
+polls in a daemon thread). Each table is swapped together with its indexes
+and a bumped version number, so derived structures such as POCreator's
+supplier ranking know when to rebuild.
+
+The frames are shared: consumers must not modify them in place.
+
+Usage:
+    python src/data_store.py    # per-table memory, compact vs default dtypes
+"""
+import sys
+import threading
+from pathlib import Path
+from functools import lru_cache
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import RAW_DATA_DIR, DATA_REFRESH_INTERVAL_SECONDS
+
+# Per table: column dtypes (columns not listed keep pandas' defaults, e.g.
+# unique IDs stay strings) and the date columns parsed to datetime64.
+# Integer columns that can be blank use the nullable 'Int32' (<NA>)
+TABLE_SCHEMAS = {
+    'materials': {
+        'dtypes': {
+            'material_code': 'category', 'material_name': 'category', 'category': 'category',
+            'subcategory': 'category', 'unit_of_measure': 'category', 'standard_price': 'int32',
+            'min_stock_level': 'int32', 'current_stock': 'int32', 'reorder_point': 'int32',
+            'lead_time_days': 'int32', 'gmp_required': 'category', 'storage_condition': 'category',
+            'supplier_count': 'int32', 'criticality': 'category',
+        },
+        'dates': ['last_purchase_date'],
+    },
+    'suppliers': {
+        'dtypes': {
+            'supplier_type': 'category', 'category_specialization': 'category', 'country': 'category',
+            'city': 'category', 'rating': 'category', 'payment_terms_days': 'int32', 'currency': 'category',
+            'lead_time_days': 'int32', 'quality_certification': 'category', 'contract_status': 'category',
+        },
+        'dates': ['last_audit_date'],
+    },
+    'purchase_orders': {
+        'dtypes': {
+            'supplier_id': 'category', 'supplier_name': 'category', 'material_code': 'category',
+            'material_name': 'category', 'quantity': 'int32', 'unit': 'category', 'unit_price_idr': 'int32',
+            'tax_percent': 'int32', 'delivery_location': 'category', 'payment_terms': 'category',
+            'status': 'category', 'created_by': 'category', 'approved_by': 'category',
+            # Blank until the goods are received
+            'received_quantity': 'Int32', 'notes': 'category',
+        },
+        'dates': ['po_date', 'delivery_date', 'approval_date', 'received_date'],
+    },
+    'invoices': {
+        'dtypes': {
+            'supplier_id': 'category', 'supplier_name': 'category', 'material_code': 'category',
+            'line_item_description': 'category', 'quantity_invoiced': 'int32', 'unit': 'category',
+            'unit_price_idr': 'int32', 'tax_percent': 'int32', 'payment_terms': 'category',
+            'payment_status': 'category', 'payment_method': 'category', 'discrepancy_flag': 'category',
+            'discrepancy_type': 'category', 'discrepancy_notes': 'category', 'validated_by': 'category',
+        },
+        'dates': ['invoice_date', 'due_date', 'payment_date', 'validation_date'],
+    },
+    'price_history': {
+        'dtypes': {
+            'material_code': 'category', 'material_name': 'category', 'supplier_id': 'category',
+            # "YYYY-MM": categories sort chronologically
+            'year_month': 'category', 'avg_unit_price_idr': 'int32', 'min_price_idr': 'int32',
+            'max_price_idr': 'int32', 'total_quantity_purchased': 'int32',
+        },
+        'dates': [],
+    },
+    'contracts': {
+        'dtypes': {
+            'supplier_id': 'category', 'supplier_name': 'category', 'contract_type': 'category',
+            'material_category': 'category', 'price_escalation_clause': 'category',
+            'payment_terms': 'category', 'auto_renewal': 'category', 'status': 'category',
+            'negotiated_by': 'category', 'expiry_alert_days': 'int32',
+        },
+        'dates': ['start_date', 'end_date'],
+    },
+}
+
+
+# Unique key per table; for duplicated keys the first row wins, as with mask[...].iloc[0]
+PRIMARY_KEYS = {
+    'invoices': 'invoice_number',
+    'purchase_orders': 'po_number',
+    'materials': 'material_code',
+    'suppliers': 'supplier_id',
+}
+# Non-unique columns grouped into row positions (in table order)
+GROUP_KEYS = {
+    'purchase_orders': 'material_code',
+    'price_history': 'material_code',
+}
+
+
+def load_table(path, schema=None):
+    """Read one CSV, with the table's compact dtypes if it has a schema"""
+    if schema is None:
+        return pd.read_csv(path)
+    return pd.read_csv(path, dtype=schema['dtypes'], parse_dates=schema['dates'])
+
+
+def format_date(value):
+    """YYYY-MM-DD for a datetime64 cell, None for NaT (JSON-safe)"""
+    return None if pd.isna(value) else value.strftime('%Y-%m-%d')
+
+
+def build_key_index(values):
+    """key -> position of its first row"""
+    index = {}
+    for position, key in enumerate(values):
+        index.setdefault(key, position)
+    return index
+
+
+def build_group_index(column):
+    """value -> int64 array of its row positions, in table order"""
+    return column.groupby(column, observed=True, sort=False).indices
+
+
+def index_table(name, frame, version=1, mtime=None):
+    """A table with its indexes, swapped in and out of the store as one object"""
+    key, column = PRIMARY_KEYS.get(name), GROUP_KEYS.get(name)
+    return SimpleNamespace(
+        frame=frame,
+        key_index=build_key_index(frame[key].tolist()) if key else None,
+        group_index=build_group_index(frame[column]) if column else None,
+        # Deep memory_usage scans every object/categorical column: measured once per load
+        bytes=int(frame.memory_usage(deep=True).sum()),
+        version=version,
+        mtime=mtime
+    )
+
+
+class ProcurementDataStore:
+    def __init__(self, raw_dir=RAW_DATA_DIR, tables=None):
+        """
+        Load every CSV in raw_dir; tables are named after their files
+
+        tables: already-loaded frames by name, instead of reading raw_dir
+        (e.g. synthetic tables for benchmarks)
+        """
+        self.raw_dir = Path(raw_dir)
+        self._refresh_lock = threading.Lock()
+        self._refresh_stop = None
+        if tables is not None:
+            self._tables = {name: index_table(name, frame) for name, frame in tables.items()}
+            return
+        self._tables = {}
+        for path in sorted(self.raw_dir.glob("*.csv")):
+            self._load(path)
+
+    def _load(self, path, version=1):
+        mtime = path.stat().st_mtime
+        frame = load_table(path, TABLE_SCHEMAS.get(path.stem))
+        # One assignment: readers see the old table and indexes or the new ones, never a mix
+        self._tables[path.stem] = index_table(path.stem, frame, version, mtime)
+
+    def refresh(self):
+        """
+        Reload the tables whose CSV changed since they were loaded
+
+        Returns:
+            Names of the reloaded tables
+        """
+        reloaded = []
+        with self._refresh_lock:
+            for path in sorted(self.raw_dir.glob("*.csv")):
+                current = self._tables.get(path.stem)
+                if current is not None and current.mtime == path.stat().st_mtime:
+                    continue
+                self._load(path, current.version + 1 if current else 1)
+                reloaded.append(path.stem)
+        if reloaded:
+            print(f"🔄 Procurement data reloaded: {', '.join(reloaded)}")
+        return reloaded
+
+    def start_auto_refresh(self, interval=DATA_REFRESH_INTERVAL_SECONDS):
+        """Check the CSVs for changes every interval seconds, in a daemon thread"""
+        if self._refresh_stop is not None:
+            return
+        self._refresh_stop = threading.Event()
+
+        def poll(stop):
+            while not stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    # Keep serving the loaded tables; retry on the next tick
+                    print(f"⚠️  Procurement data refresh failed: {str(e)}")
+
+        threading.Thread(
+            target=poll, args=(self._refresh_stop,), name="data-refresh", daemon=True
+        ).start()
+
+    def stop_auto_refresh(self):
+        if self._refresh_stop is not None:
+            self._refresh_stop.set()
+            self._refresh_stop = None
+
+    def table(self, name):
+        """The table with its indexes and version (one consistent object)"""
+        if name not in self._tables:
+            raise KeyError(f"Table '{name}' not found in {self.raw_dir}")
+        return self._tables[name]
+
+    @property
+    def tables(self):
+        return {name: table.frame for name, table in self._tables.items()}
+
+    def version(self, name):
+        """Incremented every time the table is reloaded"""
+        return self.table(name).version
+
+    def __getitem__(self, name):
+        return self.table(name).frame
+
+    def __contains__(self, name):
+        return name in self._tables
+
+    def get(self, name, key):
+        """Row of table name with primary key `key`, or None"""
+        table = self.table(name)
+        position = table.key_index.get(key)
+        if position is None:
+            return None
+        return table.frame.iloc[position]
+
+    def group(self, name, value):
+        """Rows of table name whose group column (GROUP_KEYS) equals value; empty if none"""
+        table = self.table(name)
+        positions = table.group_index.get(value)
+        if positions is None:
+            positions = np.empty(0, dtype=np.int64)
+        return table.frame.iloc[positions]
+
+    def memory_usage(self):
+        """Rows, columns and deep memory usage (bytes) per table, as measured when loaded"""
+        return {
+            name: {
+                'rows': len(table.frame),
+                'columns': len(table.frame.columns),
+                'bytes': table.bytes
+            }
+            for name, table in self._tables.items()
+        }
+
+    def memory_report(self):
+        usage = self.memory_usage()
+        lines = [f"{'table':<18} {'rows':>8} {'cols':>5} {'memory':>10}"]
+        for name, row in usage.items():
+            lines.append(f"{name:<18} {row['rows']:>8} {row['columns']:>5} {row['bytes'] / 1024:>8.1f} KB")
+        total = sum(row['bytes'] for row in usage.values())
+        lines.append(f"{'total':<18} {'':>8} {'':>5} {total / 1024:>8.1f} KB")
+        return "\n".join(lines)
+
+
+@lru_cache(maxsize=None)
+def get_data_store(raw_dir=RAW_DATA_DIR):
+    """Process-wide data store, loaded on first use"""
+    return ProcurementDataStore(raw_dir)
+
+
+if __name__ == "__main__":
+    store = get_data_store()
+    print("📊 Procurement data store (compact dtypes)")
+    print(store.memory_report())
+
+    default_bytes = sum(
+        int(pd.read_csv(store.raw_dir / f"{name}.csv").memory_usage(deep=True).sum())
+        for name in store.tables
+    )
+    compact_bytes = sum(row['bytes'] for row in store.memory_usage().values())
+    print(f"\n💾 Default dtypes: {default_bytes / 1024:.1f} KB, compact: {compact_bytes / 1024:.1f} KB "
+          f"({default_bytes / max(compact_bytes, 1):.1f}x smaller)")
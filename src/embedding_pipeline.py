@@ -0,0 +1,176 @@
+"""
+Concurrent, rate-limit-aware batch embedding pipeline
+"""
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.tokenizer import count_tokens
+from src.resilience import is_retryable, backoff_delay
+from src.config import (
+    EMBEDDING_CONCURRENCY,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_BATCH_MAX_INPUTS,
+    EMBEDDING_MAX_RETRIES
+)
+
+
+class BatchEmbedder:
+    """
+    Embeds a list of texts with several requests in flight
+
+    Batches are sized by token count as well as input count. A 429 or 5xx
+    on any worker pauses every worker until the shared cooldown expires,
+    so the pipeline backs off as a whole instead of hammering the endpoint.
+    Results are reassembled in input order.
+    """
+
+    def __init__(self, client, deployment,
+                 concurrency=EMBEDDING_CONCURRENCY,
+                 max_batch_tokens=EMBEDDING_BATCH_MAX_TOKENS,
+                 max_batch_inputs=EMBEDDING_BATCH_MAX_INPUTS,
+                 max_retries=EMBEDDING_MAX_RETRIES,
+                 verbose=True):
+        # Bulk embedding bypasses a ResilientClient: its per-call deadline
+        # (LLM_EMBEDDING_DEADLINE_SECONDS, sized for interactive queries) would
+        # abort large batches, and its per-call retries would compete with the
+        # cooldown shared by every worker here. Calls and retries are still
+        # counted in the resilient client's stats() as batch_requests / batch_retries.
+        self.resilient = client if hasattr(client, 'raw') else None
+        self.client = getattr(client, 'raw', client)
+        self.deployment = deployment
+        self.concurrency = max(1, concurrency)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.max_retries = max_retries
+        self.verbose = verbose
+
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def make_batches(self, texts):
+        """Split texts into (start_index, batch) pairs under the token and input limits"""
+        batches = []
+        start = 0
+        current = []
+        current_tokens = 0
+
+        for i, text in enumerate(texts):
+            tokens = count_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_inputs):
+                batches.append((start, current))
+                start = i
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+
+        if current:
+            batches.append((start, current))
+        return batches
+
+    def _wait_for_cooldown(self):
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _back_off(self, attempt, error):
+        """Extend the shared cooldown after a retryable error"""
+        delay = backoff_delay(attempt, error)
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            self.retries += 1
+        self._record('batch_retries')
+
+    def _record(self, name):
+        if self.resilient is not None:
+            self.resilient.count(name)
+
+    def _embed_batch(self, batch):
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_cooldown()
+            self._record('batch_requests')
+            try:
+                response = self.client.embeddings.create(
+                    model=self.deployment,
+                    input=batch
+                )
+                return [item.embedding for item in response.data]
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                self._back_off(attempt, e)
+
+    def embed(self, texts):
+        """Return embeddings for texts, in the same order"""
+        texts = list(texts)
+        results = [None] * len(texts)
+        batches = self.make_batches(texts)
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {
+                executor.submit(self._embed_batch, batch): (start, len(batch))
+                for start, batch in batches
+            }
+            for future in as_completed(futures):
+                start, size = futures[future]
+                results[start:start + size] = future.result()
+                done += size
+                if self.verbose:
+                    print(f"  Processed embeddings {done} of {len(texts)}...")
+
+        return results
+
+
+class AsyncBatchEmbedder(BatchEmbedder):
+    """
+    BatchEmbedder for an async client (AsyncAzureOpenAI or LocalAsyncClient)
+
+    Same batching, shared cooldown and ordered reassembly; concurrency is
+    bounded by a semaphore on the running event loop instead of threads.
+    """
+
+    async def _await_cooldown(self):
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _aembed_batch(self, batch, semaphore):
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._await_cooldown()
+                self._record('batch_requests')
+                try:
+                    response = await self.client.embeddings.create(
+                        model=self.deployment,
+                        input=batch
+                    )
+                    return [item.embedding for item in response.data]
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    self._back_off(attempt, e)
+
+    async def aembed(self, texts):
+        """Return embeddings for texts, in the same order"""
+        texts = list(texts)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        batches = self.make_batches(texts)
+        embedded = await asyncio.gather(*(
+            self._aembed_batch(batch, semaphore) for _, batch in batches
+        ))
+        results = []
+        for vectors in embedded:
+            results.extend(vectors)
+        if self.verbose:
+            print(f"  Processed embeddings {len(results)} of {len(texts)}...")
+        return results
@@ -1,35 +1,39 @@
 import sys
+import argparse
 from pathlib import Path
-import pickle
 import numpy as np
 import faiss
-from openai import AzureOpenAI
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.cache import ChunkEmbeddingCache
+from src.providers import create_client, create_async_client, embedding_deployment
+from src.embedding_pipeline import BatchEmbedder, AsyncBatchEmbedder
+from src.index_factory import INDEX_TYPES, QUANTIZATIONS, REDUCTIONS, REFINES, build_index, index_memory_bytes
+from src.vector_store import write_chunk_store, new_version, staging_dir, publish_version, prune_versions
+from src.lexical_index import LexicalIndex
+from src.chunker import RecordChunker, chunk_statistics
 from src.config import (
     DOCUMENTS_DIR,
     VECTOR_STORE_DIR,
-    AZURE_OPENAI_ENDPOINT,
-    AZURE_OPENAI_KEY,
-    AZURE_EMBEDDING_DEPLOYMENT,
-    AZURE_API_VERSION,
-    EMBEDDING_DIMENSION
+    INDEX_TYPE,
+    INDEX_QUANTIZATION,
+    INDEX_REDUCTION,
+    INDEX_REDUCED_DIM,
+    INDEX_REFINE
 )
 
 class EmbeddingManager:
-    def __init__(self):
+    def __init__(self, client=None):
         self.docs_dir = DOCUMENTS_DIR
         self.vector_store_dir = VECTOR_STORE_DIR
         
-        # Initialize Azure OpenAI client
-        self.client = AzureOpenAI(
-            azure_endpoint=AZURE_OPENAI_ENDPOINT,
-            api_key=AZURE_OPENAI_KEY,
-            api_version=AZURE_API_VERSION
-        )
-        self.embedding_deployment = AZURE_EMBEDDING_DEPLOYMENT
+        # Initialize model client (Azure OpenAI or local backend)
+        self.client = client or create_client()
+        self.embedding_deployment = embedding_deployment()
+        self.chunk_cache = ChunkEmbeddingCache(self.embedding_deployment)
+        self.chunker = RecordChunker()
     
     def load_documents(self):
         """Load all text documents from directories"""
@@ -55,7 +59,7 @@ class EmbeddingManager:
         return documents, metadata
     
     def split_text(self, text, chunk_size=1000, chunk_overlap=100):
-        """Simple text splitter"""
+        """Legacy character splitter, kept for chunk statistics comparisons"""
         chunks = []
         start = 0
         text_length = len(text)
@@ -76,26 +80,66 @@ class EmbeddingManager:
         )
         return response.data[0].embedding
     
-    def get_embeddings_batch(self, texts, batch_size=10):
-        """Get embeddings in batches for efficiency"""
-        embeddings = []
-        
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            print(f"  Processing embeddings {i+1}-{min(i+batch_size, len(texts))} of {len(texts)}...")
-            
-            response = self.client.embeddings.create(
-                model=self.embedding_deployment,
-                input=batch
-            )
-            
-            batch_embeddings = [item.embedding for item in response.data]
-            embeddings.extend(batch_embeddings)
-        
-        return embeddings
+    def get_embeddings_batch(self, texts, **pipeline_options):
+        """
+        Get embeddings through the concurrent batch pipeline
+        
+        Args:
+            texts: Texts to embed
+            pipeline_options: Overrides for BatchEmbedder (concurrency,
+                max_batch_tokens, max_batch_inputs, max_retries)
+        """
+        embedder = BatchEmbedder(self.client, self.embedding_deployment, **pipeline_options)
+        return embedder.embed(texts)
+    
+    async def aget_embeddings_batch(self, texts, async_client=None, **pipeline_options):
+        """Async counterpart of get_embeddings_batch for callers already on an event loop"""
+        embedder = AsyncBatchEmbedder(
+            async_client or create_async_client(), self.embedding_deployment, **pipeline_options
+        )
+        return await embedder.aembed(texts)
+    
+    def embed_chunks(self, chunks):
+        """
+        Embed chunks, only calling the API for text not in the chunk cache
+        
+        Returns:
+            (embeddings, stats) where stats counts reused vs computed vectors
+        """
+        cached = self.chunk_cache.get_many(chunks)
+        
+        # Deduplicate so identical chunk text is only embedded once
+        missing = []
+        seen = set()
+        for chunk in chunks:
+            key = self.chunk_cache.key(chunk)
+            if key not in cached and key not in seen:
+                seen.add(key)
+                missing.append(chunk)
+        
+        if missing:
+            new_embeddings = self.get_embeddings_batch(missing)
+            self.chunk_cache.set_many(missing, new_embeddings)
+            for chunk, embedding in zip(missing, new_embeddings):
+                cached[self.chunk_cache.key(chunk)] = embedding
+        
+        embeddings = [cached[self.chunk_cache.key(chunk)] for chunk in chunks]
+        stats = {
+            'total': len(chunks),
+            'reused': len(chunks) - len(missing),
+            'computed': len(missing)
+        }
+        return embeddings, stats
     
-    def create_vector_store(self):
-        """Create FAISS vector store from documents"""
+    def create_vector_store(self, index_type=INDEX_TYPE, **index_options):
+        """
+        Create FAISS vector store from documents
+        
+        Args:
+            index_type: One of INDEX_TYPES
+            index_options: Overrides for build_index (quantization,
+                reduction, reduced_dim, refine, ...)
+        """
         print("🔄 Loading documents...")
         documents, metadata = self.load_documents()
         
@@ -110,43 +154,80 @@ class EmbeddingManager:
         all_metadata = []
         
         for doc, meta in zip(documents, metadata):
-            chunks = self.split_text(doc, chunk_size=1000, chunk_overlap=100)
+            chunks = self.chunker.split(doc)
             all_chunks.extend(chunks)
             all_metadata.extend([meta] * len(chunks))
         
-        print(f"📝 Created {len(all_chunks)} text chunks")
+        stats = chunk_statistics(all_chunks)
+        print(f"📝 Created {stats['chunks']} text chunks "
+              f"({stats['mean_tokens']} tokens avg, {stats['max_tokens']} max)")
         
         # Create embeddings
-        print("🧠 Creating embeddings (this may take a few minutes)...")
-        embeddings = self.get_embeddings_batch(all_chunks, batch_size=10)
+        print("🧠 Creating embeddings (unchanged chunks are reused from cache)...")
+        embeddings, embed_stats = self.embed_chunks(all_chunks)
+        print(f"   - Reused: {embed_stats['reused']} vectors")
+        print(f"   - Computed: {embed_stats['computed']} vectors")
         
         # Convert to numpy array
         embeddings_array = np.array(embeddings).astype('float32')
         
         # Create FAISS index
-        print("🔧 Building FAISS index...")
-        index = faiss.IndexFlatL2(EMBEDDING_DIMENSION)
-        index.add(embeddings_array)
+        print(f"🔧 Building FAISS index ({index_type})...")
+        index, index_params = build_index(embeddings_array, index_type=index_type, **index_options)
         
-        # Save everything
-        self.vector_store_dir.mkdir(parents=True, exist_ok=True)
+        # Save everything into a new version directory; servers keep using
+        # the previous version until it is published below
+        version = new_version()
+        build_dir = staging_dir(self.vector_store_dir, version)
+        build_dir.mkdir(parents=True)
         
         # Save FAISS index
-        faiss.write_index(index, str(self.vector_store_dir / "index.faiss"))
+        faiss.write_index(index, str(build_dir / "index.faiss"))
         
-        # Save chunks and metadata
-        with open(self.vector_store_dir / "chunks.pkl", 'wb') as f:
-            pickle.dump(all_chunks, f)
+        # Save chunks and metadata in the mmap-friendly layout
+        write_chunk_store(
+            build_dir, all_chunks, all_metadata,
+            extra_info={'index': index_params},
+            version=version
+        )
+        
+        # Save lexical index for identifier lookups and BM25
+        lexical = LexicalIndex.build(all_chunks, all_metadata)
+        lexical.save(build_dir)
         
-        with open(self.vector_store_dir / "metadata.pkl", 'wb') as f:
-            pickle.dump(all_metadata, f)
+        store_dir = publish_version(self.vector_store_dir, version)
+        removed = prune_versions(self.vector_store_dir)
         
-        print(f"✅ Vector store saved to {self.vector_store_dir}")
+        print(f"✅ Vector store version {version} published to {store_dir}")
+        if removed:
+            print(f"   - Removed old versions: {', '.join(removed)}")
         print(f"   - Index size: {len(embeddings_array)} vectors")
-        print(f"   - Dimension: {EMBEDDING_DIMENSION}")
+        print(f"   - Index type: {index_type}")
+        print(f"   - Dimension: {index_params['dimension']}")
+        compression = {
+            key: index_params[key] for key in ('quantization', 'reduction', 'reduced_dim', 'refine')
+            if key in index_params
+        }
+        if compression:
+            print(f"   - Compression: {compression}")
+        print(f"   - Index memory: {index_memory_bytes(index) / 1024 ** 2:.2f} MB")
         
         return index, all_chunks, all_metadata
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the FAISS vector store")
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default=INDEX_TYPE)
+    parser.add_argument('--quantization', choices=QUANTIZATIONS, default=INDEX_QUANTIZATION)
+    parser.add_argument('--reduction', choices=REDUCTIONS, default=INDEX_REDUCTION)
+    parser.add_argument('--reduced-dim', type=int, default=INDEX_REDUCED_DIM)
+    parser.add_argument('--refine', choices=REFINES, default=INDEX_REFINE)
+    args = parser.parse_args()
+    
     manager = EmbeddingManager()
-    manager.create_vector_store()
\ No newline at end of file
+    manager.create_vector_store(
+        index_type=args.index_type,
+        quantization=args.quantization,
+        reduction=args.reduction,
+        reduced_dim=args.reduced_dim,
+        refine=args.refine
+    )
\ No newline at end of file
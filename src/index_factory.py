@@ -0,0 +1,203 @@
+"""
+FAISS index construction for the vector store
+
+Supported index types:
+    flat      exact brute-force L2 scan (baseline)
+    ivf_flat  inverted lists over k-means cells, full vectors
+    ivf_pq    inverted lists with product-quantized codes
+    hnsw      hierarchical navigable small-world graph
+
+Any of them can additionally store fp16/int8 scalar-quantized vectors,
+search in a PCA/OPQ-reduced space, and re-score the top candidates
+against full-precision vectors (refine).
+"""
+import sys
+import math
+from pathlib import Path
+import numpy as np
+import faiss
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import (
+    INDEX_TYPE,
+    IVF_NLIST,
+    IVF_NPROBE,
+    PQ_M,
+    PQ_NBITS,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    INDEX_QUANTIZATION,
+    INDEX_REDUCTION,
+    INDEX_REDUCED_DIM,
+    INDEX_REFINE,
+    INDEX_REFINE_K_FACTOR
+)
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw')
+QUANTIZATIONS = ('none', 'fp16', 'int8')
+REDUCTIONS = ('none', 'pca', 'opq')
+REFINES = ('none', 'flat', 'fp16')
+
+SQ_TYPES = {
+    'fp16': faiss.ScalarQuantizer.QT_fp16,
+    'int8': faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def _auto_nlist(n_vectors):
+    """~4*sqrt(n) cells, but keep at least 39 training points per cell"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def _choice(name, value, choices):
+    if value not in choices:
+        raise ValueError(f"Unknown {name} '{value}'. Choose from {choices}")
+
+
+def _core_index(index_type, dimension, n_vectors, quantization, params,
+                nlist, pq_m, pq_nbits, hnsw_m, ef_construction):
+    """The searchable index, over vectors of the given (possibly reduced) dimension"""
+    sq_type = SQ_TYPES.get(quantization)
+
+    if index_type == 'flat':
+        if sq_type is None:
+            return faiss.IndexFlatL2(dimension)
+        return faiss.IndexScalarQuantizer(dimension, sq_type)
+
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        nlist = nlist or _auto_nlist(n_vectors)
+        nlist = max(1, min(nlist, n_vectors))
+        params['nlist'] = nlist
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == 'ivf_flat':
+            if sq_type is None:
+                return faiss.IndexIVFFlat(quantizer, dimension, nlist)
+            return faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, sq_type)
+        if sq_type is not None:
+            raise ValueError("ivf_pq codes are already quantized; use quantization 'none'")
+        if dimension % pq_m != 0:
+            raise ValueError(f"PQ_M={pq_m} must divide the dimension {dimension}")
+        # Each PQ sub-quantizer needs at least 2**nbits training points
+        pq_nbits = max(1, min(pq_nbits, int(math.log2(max(n_vectors, 2)))))
+        params.update({'pq_m': pq_m, 'pq_nbits': pq_nbits})
+        return faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_nbits)
+
+    params.update({'hnsw_m': hnsw_m, 'ef_construction': ef_construction})
+    if sq_type is None:
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m)
+    else:
+        index = faiss.IndexHNSWSQ(dimension, sq_type, hnsw_m)
+    index.hnsw.efConstruction = ef_construction
+    return index
+
+
+def build_index(vectors, index_type=INDEX_TYPE, nlist=IVF_NLIST, pq_m=PQ_M,
+                pq_nbits=PQ_NBITS, hnsw_m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION,
+                quantization=INDEX_QUANTIZATION, reduction=INDEX_REDUCTION,
+                reduced_dim=INDEX_REDUCED_DIM, refine=INDEX_REFINE,
+                refine_k_factor=INDEX_REFINE_K_FACTOR):
+    """
+    Build, train and fill an index of the requested type
+
+    Returns:
+        (index, params) where params records what was actually used,
+        after clamping to what the corpus size can support
+    """
+    _choice('index type', index_type, INDEX_TYPES)
+    _choice('quantization', quantization, QUANTIZATIONS)
+    _choice('reduction', reduction, REDUCTIONS)
+    _choice('refine', refine, REFINES)
+
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    n_vectors, dimension = vectors.shape
+    params = {'index_type': index_type, 'dimension': dimension}
+
+    transform = None
+    search_dim = dimension
+    if reduction != 'none':
+        # PCA cannot produce more components than it has training vectors
+        search_dim = min(reduced_dim, dimension, n_vectors)
+        if reduction == 'pca':
+            transform = faiss.PCAMatrix(dimension, search_dim)
+        else:
+            if search_dim % pq_m != 0:
+                raise ValueError(f"PQ_M={pq_m} must divide the reduced dimension {search_dim}")
+            transform = faiss.OPQMatrix(dimension, pq_m, search_dim)
+            # The default 50 rotation/PQ iterations take minutes even on small corpora
+            transform.niter = 10
+        params.update({'reduction': reduction, 'reduced_dim': search_dim})
+    if quantization != 'none':
+        params['quantization'] = quantization
+
+    index = _core_index(index_type, search_dim, n_vectors, quantization, params,
+                        nlist, pq_m, pq_nbits, hnsw_m, ef_construction)
+    if transform is not None:
+        index = faiss.IndexPreTransform(transform, index)
+    if refine != 'none':
+        if refine == 'flat':
+            index = faiss.IndexRefineFlat(index)
+        else:
+            index = faiss.IndexRefine(index, faiss.IndexScalarQuantizer(dimension, SQ_TYPES['fp16']))
+        index.k_factor = refine_k_factor
+        params.update({'refine': refine, 'refine_k_factor': refine_k_factor})
+
+    if not index.is_trained:
+        index.train(vectors)
+    if reduction == 'pca':
+        # Only the projection is needed to search; the training matrix would be saved too
+        transform.PCAMat.clear()
+    index.add(vectors)
+    return index, params
+
+
+def base_index(index):
+    """Innermost searchable index, below any refine and pre-transform wrappers"""
+    index = faiss.downcast_index(index)
+    while True:
+        if isinstance(index, faiss.IndexRefine):
+            index = faiss.downcast_index(index.base_index)
+        elif isinstance(index, faiss.IndexPreTransform):
+            index = faiss.downcast_index(index.index)
+        else:
+            return index
+
+
+def configure_search(index, index_type, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+    """Apply query-time knobs; these can be tuned without rebuilding"""
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    elif index_type == 'hnsw':
+        base_index(index).hnsw.efSearch = ef_search
+    return index
+
+
+def search_parameters(index, index_type, selector):
+    """
+    SearchParameters restricting a search to the selector's IDs
+
+    Passing params replaces the index's own nprobe/efSearch (and refine
+    k_factor), so the currently configured values are copied across.
+    """
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(index).nprobe)
+    elif index_type == 'hnsw':
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=base_index(index).hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+
+    outer = faiss.downcast_index(index)
+    if isinstance(outer, faiss.IndexRefine):
+        base_params = params
+        params = faiss.IndexRefineSearchParameters(base_index_params=base_params, k_factor=outer.k_factor)
+        # SWIG does not keep the nested parameters alive on its own
+        params.referenced_objects = [base_params]
+    return params
+
+
+def index_memory_bytes(index):
+    """Serialized size, a close proxy for resident memory"""
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,272 @@
+"""
+Intent router: structured procurement questions answered without the LLM
+
+"Validate INV-2024-130", "compare prices for RAW-001" or "suggest a PO for
+5000 of PKG-002" are answered deterministically by the use-case classes.
+The router pulls identifiers and quantities out of the question, scores it
+against a small keyword model per intent, and only routes when the winning
+intent is clear and its entities are present; everything else goes to
+retrieval and the LLM as before.
+"""
+import re
+import sys
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.lexical_index import tokenize
+from src.query_parser import ID_PATTERNS, extract_identifiers
+from src.config import INTENT_ROUTER_MIN_SCORE
+
+# Term weights per intent; a question's score is the sum over its terms
+INTENT_KEYWORDS = {
+    'validate_invoice': {
+        'validate': 3, 'validation': 3, 'verify': 2, 'match': 2, 'matching': 2, 'matches': 2,
+        'discrepancy': 2, 'discrepancies': 2, '3-way': 2, 'three-way': 2, 'check': 1, 'approve': 1
+    },
+    'compare_prices': {
+        'compare': 3, 'comparison': 3, 'cheapest': 2, 'cheaper': 2, 'across': 1,
+        'suppliers': 1, 'supplier': 1, 'prices': 1, 'price': 1, 'vs': 1, 'versus': 1
+    },
+    'price_trend': {
+        'trend': 3, 'trends': 3, 'history': 2, 'historical': 2, 'volatility': 2, 'over': 1,
+        'time': 1, 'change': 1, 'changed': 1, 'increase': 1, 'increasing': 1, 'monthly': 1
+    },
+    'create_po': {
+        # No 'order' / 'need': together they would route questions about existing orders
+        'suggest': 2, 'create': 2, 'draft': 2, 'buy': 2, 'po': 2, 'procure': 2,
+        'purchase': 1, 'raise': 1, 'recommend': 1
+    },
+}
+# Entity each intent cannot be answered without
+REQUIRED_ENTITIES = {
+    'validate_invoice': ('invoice_number',),
+    'compare_prices': ('material_code',),
+    'price_trend': ('material_code',),
+    'create_po': ('material_code', 'quantity'),
+}
+# A question naming one of these is about an existing record, not a new PO
+EXISTING_RECORD_CATEGORIES = ('purchase_orders', 'invoices')
+# 5000, 5,000 and 5.000 (Indonesian thousands separator) are all 5000
+QUANTITY_PATTERN = re.compile(r"\b\d{1,3}(?:[,.]\d{3})+\b|\b\d+\b")
+# A number is only a quantity right before a unit word or right after one of these words
+QUANTITY_UNIT_AFTER = re.compile(
+    r"\s*(?:kgs?|kilograms?|g|grams?|l|liters?|litres?|ml|units?|pcs|pieces?|rolls?|box(?:es)?|"
+    r"vials?|bottles?|packs?|ampoules?|bags?|drums?|cartons?)\b", re.IGNORECASE
+)
+QUANTITY_PREFIX_BEFORE = re.compile(r"\b(?:of|for|qty|quantity)\s*[:=]?\s*$", re.IGNORECASE)
+# "in 2 weeks", "for 2024": durations and years are not quantities
+TIME_UNIT_AFTER = re.compile(r"\s*(?:seconds?|minutes?|hours?|days?|weeks?|months?|years?)\b", re.IGNORECASE)
+YEAR_PATTERN = re.compile(r"(?:19|20)\d{2}")
+
+
+def extract_quantity(text):
+    """
+    First quantity in text, or None
+    
+    Identifiers are ignored, and so are numbers that are not next to a unit
+    word or after of/for/qty/quantity. A year (without a unit) or a number
+    followed by a time unit is not a quantity either.
+    """
+    for pattern in ID_PATTERNS.values():
+        text = pattern.sub(" ", text)
+    for match in QUANTITY_PATTERN.finditer(text):
+        after = text[match.end():]
+        if TIME_UNIT_AFTER.match(after):
+            continue
+        if not QUANTITY_UNIT_AFTER.match(after):
+            if YEAR_PATTERN.fullmatch(match.group()) or not QUANTITY_PREFIX_BEFORE.search(text[:match.start()]):
+                continue
+        quantity = int(re.sub(r"[,.]", "", match.group()))
+        if quantity > 0:
+            return quantity
+    return None
+
+
+def extract_entities(text):
+    identifiers = extract_identifiers(text)
+    entities = {
+        'invoice_number': identifiers.get('invoices', [None])[0],
+        'material_code': identifiers.get('materials', [None])[0],
+        'quantity': extract_quantity(text),
+    }
+    return {name: value for name, value in entities.items() if value is not None}
+
+
+def classify(text):
+    """Intent scores for text, best first: [(intent, score)]; a repeated keyword counts once"""
+    tokens = set(tokenize(text))
+    scores = {
+        intent: sum(weights.get(token, 0) for token in tokens)
+        for intent, weights in INTENT_KEYWORDS.items()
+    }
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _rupiah(value):
+    return f"Rp {value:,.0f}"
+
+
+def format_validation(result):
+    checks = result['checks']
+    details = result['invoice_details']
+    lines = [
+        f"**Invoice {checks['invoice_number']} vs {checks['po_number']}: {result['status']}**",
+        "",
+        f"- Supplier: {details['supplier']} (match: {'yes' if checks['supplier_match'] else 'no'})",
+        f"- Material: {details['material']} (match: {'yes' if checks['material_match'] else 'no'})",
+        f"- Invoice total: {details['invoice_total']}",
+        f"- PO total: {details['po_total']}",
+        f"- Due date: {details['due_date']}",
+    ]
+    if result['discrepancies']:
+        lines += ["", "Discrepancies:"] + [f"- {item}" for item in result['discrepancies']]
+    lines += ["", result['recommendation']]
+    return "\n".join(lines)
+
+
+def format_comparison(result):
+    lines = [
+        f"**Supplier prices for {result['material_code']} ({result['material_name']}), per {result['unit']}**",
+        "",
+        "| Supplier | Avg | Min | Max | Orders |",
+        "|---|---|---|---|---|",
+    ]
+    for supplier, row in result['supplier_comparison'].items():
+        lines.append(
+            f"| {supplier} | {_rupiah(row['avg_price'])} | {_rupiah(row['min_price'])} "
+            f"| {_rupiah(row['max_price'])} | {int(row['order_count'])} |"
+        )
+    return "\n".join(lines)
+
+
+def format_trend(result):
+    return "\n".join([
+        f"**Price trend for {result['material_code']} ({result['material_name']})**",
+        "",
+        f"- Period: {result['period']}",
+        f"- Starting price: {result['starting_price']}",
+        f"- Current price: {result['current_price']}",
+        f"- Change: {result['change_percent']} ({result['trend']})",
+        f"- Average volatility: {result['avg_volatility']}",
+    ])
+
+
+def format_po(result):
+    return "\n".join([
+        f"**Draft PO: {result['quantity']:,} {result['unit']} of {result['material_code']} ({result['material_name']})**",
+        "",
+        f"- Recommended supplier: {result['recommended_supplier_name']} ({result['recommended_supplier_id']}), "
+        f"rating {result['supplier_rating']}",
+        f"- Lead time: {result['lead_time_days']} days, payment terms {result['payment_terms']}",
+        f"- Unit price: {_rupiah(result['unit_price'])}",
+        f"- Subtotal: {_rupiah(result['subtotal'])}",
+        f"- VAT: {_rupiah(result['tax'])}",
+        f"- Total: {_rupiah(result['total_amount'])}",
+        f"- Required approver: {result['required_approver']}",
+        "",
+        result['reason'],
+    ])
+
+
+FORMATTERS = {
+    'validate_invoice': format_validation,
+    'compare_prices': format_comparison,
+    'price_trend': format_trend,
+    'create_po': format_po,
+}
+
+
+class IntentRouter:
+    def __init__(self, po_creator=None, invoice_validator=None, price_comparator=None,
+                 min_score=INTENT_ROUTER_MIN_SCORE):
+        """Use-case objects not passed in are created on first use (each loads its CSVs)"""
+        self._po_creator = po_creator
+        self._invoice_validator = invoice_validator
+        self._price_comparator = price_comparator
+        self.min_score = min_score
+
+    @property
+    def po_creator(self):
+        if self._po_creator is None:
+            from use_cases.create_po import POCreator
+            self._po_creator = POCreator()
+        return self._po_creator
+
+    @property
+    def invoice_validator(self):
+        if self._invoice_validator is None:
+            from use_cases.validate_invoice import InvoiceValidator
+            self._invoice_validator = InvoiceValidator()
+        return self._invoice_validator
+
+    @property
+    def price_comparator(self):
+        if self._price_comparator is None:
+            from use_cases.price_comparison import PriceComparator
+            self._price_comparator = PriceComparator()
+        return self._price_comparator
+
+    def detect(self, question):
+        """
+        Intent and entities of a structured question, or None
+
+        Routes only when the top intent reaches min_score, beats the
+        runner-up, and all of its required entities were found.
+        """
+        (intent, score), (_, runner_up) = classify(question)[:2]
+        if score < self.min_score or score == runner_up:
+            return None
+        if intent == 'create_po' and any(
+            category in EXISTING_RECORD_CATEGORIES for category in extract_identifiers(question)
+        ):
+            return None
+        entities = extract_entities(question)
+        if not all(name in entities for name in REQUIRED_ENTITIES[intent]):
+            return None
+        return intent, entities
+
+    def run(self, intent, entities):
+        if intent == 'validate_invoice':
+            return self.invoice_validator.validate(entities['invoice_number'])
+        if intent == 'compare_prices':
+            return self.price_comparator.compare_suppliers(entities['material_code'])
+        if intent == 'price_trend':
+            return self.price_comparator.price_trend(entities['material_code'])
+        if intent == 'create_po':
+            return self.po_creator.suggest_po(entities['material_code'], entities['quantity'])
+        raise ValueError(f"Unknown intent '{intent}'")
+
+    def route(self, question):
+        """
+        Answer a structured question from the use cases
+
+        Returns:
+            SimpleNamespace(intent, entities, result, text), or None when the
+            question should go through retrieval and the LLM (including when
+            the use case has no answer, e.g. no price history for the code)
+        """
+        detected = self.detect(question)
+        if detected is None:
+            return None
+        intent, entities = detected
+        result = self.run(intent, entities)
+        if 'error' in result:
+            return None
+        return SimpleNamespace(intent=intent, entities=entities, result=result, text=FORMATTERS[intent](result))
+
+    @staticmethod
+    def format_messages(question, routed):
+        """Chat messages asking the LLM to phrase a routed result, without retrieval"""
+        return [
+            {"role": "system", "content": (
+                "You are a Procurement Assistant for Bio Farma. Answer the user's question "
+                "using only this result from the procurement system. Cite IDs, use IDR "
+                "formatting and flag any discrepancies. Be concise.\n\n"
+                f"{json.dumps(routed.result, default=str, indent=2)}"
+            )},
+            {"role": "user", "content": question}
+        ]
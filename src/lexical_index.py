@@ -0,0 +1,177 @@
+"""
+Inverted index over chunk text: BM25 terms plus an identifier map
+
+Built alongside the FAISS index so that queries naming a PO, invoice,
+supplier or material can be answered without an embedding call, and so
+lexical and dense rankings can be fused for everything else.
+
+Saved into the store directory as CSR arrays, opened with mmap like the
+chunk store so workers share the pages instead of each unpickling a copy:
+    lexical_terms.npy         sorted vocabulary
+    lexical_term_offsets.npy  int64[terms + 1] offsets into the postings
+    lexical_doc_ids.npy       int32 chunk ids, per term in chunk order
+    lexical_tfs.npy           float32 term frequencies, aligned with doc ids
+    lexical_doc_lengths.npy   float32 token count per chunk
+    lexical_ids.npy           sorted identifiers (e.g. PO-2024-001)
+    lexical_id_offsets.npy    int64[identifiers + 1] offsets into id chunks
+    lexical_id_chunks.npy     int32 chunk ids of the document named after each identifier
+"""
+import re
+import sys
+import math
+from pathlib import Path
+from collections import Counter
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.query_parser import extract_identifiers
+
+# Keeps hyphenated identifiers such as po-2024-001 as single terms
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have',
+    'how', 'i', 'in', 'is', 'it', 'me', 'of', 'on', 'or', 'show', 'tell', 'that',
+    'the', 'this', 'to', 'was', 'what', 'when', 'which', 'who', 'with'
+}
+
+
+LEXICAL_ARRAYS = [
+    'terms', 'term_offsets', 'doc_ids', 'tfs', 'doc_lengths', 'ids', 'id_offsets', 'id_chunks'
+]
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _csr(groups, dtype):
+    """{key: [values]} -> (sorted keys, int64 offsets, concatenated values)"""
+    keys = sorted(groups)
+    offsets = np.zeros(len(keys) + 1, dtype='int64')
+    offsets[1:] = np.cumsum([len(groups[key]) for key in keys])
+    values = np.array([value for key in keys for value in groups[key]], dtype=dtype)
+    return np.array(keys, dtype='U'), offsets, values
+
+
+def _row(keys, offsets, key):
+    """(start, end) of key's values, or None if the key is absent"""
+    position = int(np.searchsorted(keys, key))
+    if position == len(keys) or keys[position] != key:
+        return None
+    return int(offsets[position]), int(offsets[position + 1])
+
+
+class LexicalIndex:
+    def __init__(self, terms, term_offsets, doc_ids, tfs, doc_lengths,
+                 ids, id_offsets, id_chunks, k1=1.5, b=0.75):
+        """
+        Args: the CSR arrays listed in the module docstring; in-memory when
+        built, read-only mmaps when loaded
+        """
+        self.terms = terms
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.ids = ids
+        self.id_offsets = id_offsets
+        self.id_chunks = id_chunks
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        self.n_docs = len(doc_lengths)
+
+    @classmethod
+    def build(cls, chunks, metadata):
+        term_docs = {}
+        doc_lengths = np.zeros(len(chunks), dtype='float32')
+        id_map = {}
+
+        for chunk_id, (chunk, meta) in enumerate(zip(chunks, metadata)):
+            counts = Counter(tokenize(chunk))
+            doc_lengths[chunk_id] = sum(counts.values())
+            for term, count in counts.items():
+                term_docs.setdefault(term, []).append((chunk_id, count))
+
+            # Documents are written as <ID>.txt by DataProcessor
+            stem = Path(meta['filename']).stem.upper()
+            if extract_identifiers(stem):
+                id_map.setdefault(stem, []).append(chunk_id)
+
+        terms, term_offsets, doc_ids = _csr(
+            {term: [doc for doc, _ in docs] for term, docs in term_docs.items()}, 'int32'
+        )
+        tfs = np.array([count for term in terms for _, count in term_docs[term]], dtype='float32')
+        ids, id_offsets, id_chunks = _csr(id_map, 'int32')
+        return cls(terms, term_offsets, doc_ids, tfs, doc_lengths, ids, id_offsets, id_chunks)
+
+    @staticmethod
+    def exists(directory):
+        return (Path(directory) / "lexical_terms.npy").exists()
+
+    def save(self, directory):
+        directory = Path(directory)
+        for name in LEXICAL_ARRAYS:
+            np.save(directory / f"lexical_{name}.npy", getattr(self, name))
+
+    @classmethod
+    def load(cls, directory):
+        directory = Path(directory)
+        return cls(*(np.load(directory / f"lexical_{name}.npy", mmap_mode='r') for name in LEXICAL_ARRAYS))
+
+    def postings(self, term):
+        """(int32 chunk ids, float32 term frequencies) of term, or None"""
+        row = _row(self.terms, self.term_offsets, term)
+        if row is None:
+            return None
+        start, end = row
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def lookup_identifiers(self, text):
+        """Chunk ids of the documents named by identifiers in text, in mention order"""
+        chunk_ids = []
+        for identifiers in extract_identifiers(text).values():
+            for identifier in identifiers:
+                row = _row(self.ids, self.id_offsets, identifier)
+                if row is not None:
+                    chunk_ids.extend(int(idx) for idx in self.id_chunks[row[0]:row[1]])
+        return list(dict.fromkeys(chunk_ids))
+
+    def search(self, query, k, mask=None):
+        """
+        BM25 top-k
+
+        Args:
+            mask: Optional boolean array over chunk ids; False rows are excluded
+
+        Returns:
+            List of (chunk_id, score), best first
+        """
+        scores = np.zeros(self.n_docs, dtype='float32')
+        for term in set(tokenize(query)):
+            postings = self.postings(term)
+            if postings is None:
+                continue
+            doc_ids, tfs = postings
+            idf = math.log(1 + (self.n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_ids] / self.avg_length)
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        if mask is not None:
+            scores[~mask] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(chunk_id), float(scores[chunk_id])) for chunk_id in ranked]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked lists of chunk ids; returns [(chunk_id, fused_score)] best first"""
+    fused = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,255 @@
+"""
+Model provider abstraction
+
+create_client() returns an object with the same surface the rest of the
+code uses from AzureOpenAI (client.embeddings.create and
+client.chat.completions.create). LLM_PROVIDER=local swaps in deterministic
+offline backends so indexing and chat can be profiled without the service.
+
+The sync client is shared by the whole process: one connection pool, one
+retry budget, wrapped by ResilientClient for deadlines, retries and hedging.
+"""
+import re
+import sys
+import time
+import zlib
+import asyncio
+from pathlib import Path
+from functools import lru_cache
+from types import SimpleNamespace
+import numpy as np
+import openai
+from openai import AzureOpenAI, AsyncAzureOpenAI
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.lexical_index import tokenize
+from src.resilience import RetryBudget, ResilientClient, AsyncResilientClient
+from src.config import (
+    LLM_PROVIDER,
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_KEY,
+    AZURE_OPENAI_DEPLOYMENT,
+    AZURE_EMBEDDING_DEPLOYMENT,
+    AZURE_API_VERSION,
+    EMBEDDING_DIMENSION,
+    LOCAL_EMBEDDING_MODEL,
+    LOCAL_CHAT_MODEL,
+    LOCAL_EMBEDDING_LATENCY_MS,
+    LOCAL_CHAT_LATENCY_MS,
+    LOCAL_CHAT_TOKEN_LATENCY_MS,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_CHAT_DEADLINE_SECONDS
+)
+
+# Sync and async clients draw retries and hedges from the same budget
+RETRY_BUDGET = RetryBudget()
+
+
+def hashing_embedding(text, dimension=EMBEDDING_DIMENSION):
+    """
+    Signed feature hashing of unigrams and bigrams, L2-normalized
+
+    Deterministic across processes (crc32, not hash()), and texts sharing
+    terms land close together, so retrieval results are meaningful.
+    """
+    vector = np.zeros(dimension, dtype='float32')
+    tokens = tokenize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for feature in features:
+        h = zlib.crc32(feature.encode('utf-8'))
+        vector[h % dimension] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class LocalEmbeddings:
+    def __init__(self, latency_ms=LOCAL_EMBEDDING_LATENCY_MS, dimension=EMBEDDING_DIMENSION):
+        self.latency_ms = latency_ms
+        self.dimension = dimension
+
+    def create(self, model, input, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._response(model, input)
+
+    def _response(self, model, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        tokens = sum(len(text.split()) for text in texts)
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=hashing_embedding(text, self.dimension).tolist())
+                for i, text in enumerate(texts)
+            ],
+            model=model,
+            usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens)
+        )
+
+
+class LocalChatCompletions:
+    """Canned-response chat model that reports what it was given"""
+
+    def __init__(self, latency_ms=LOCAL_CHAT_LATENCY_MS, token_latency_ms=LOCAL_CHAT_TOKEN_LATENCY_MS):
+        self.latency_ms = latency_ms
+        self.token_latency_ms = token_latency_ms
+
+    @staticmethod
+    def _chunks(response, include_usage=False):
+        """Split a response into chunks shaped like openai ChatCompletionChunk, one word each"""
+        for word in re.findall(r"\S+\s*", response.choices[0].message.content):
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=word), finish_reason=None)],
+                model=response.model,
+                usage=None
+            )
+        # stream_options={"include_usage": True}: a final chunk with usage and no choices
+        if include_usage:
+            yield SimpleNamespace(choices=[], model=response.model, usage=response.usage)
+
+    def _stream(self, response, include_usage=False):
+        for chunk in self._chunks(response, include_usage):
+            if self.token_latency_ms:
+                time.sleep(self.token_latency_ms / 1000)
+            yield chunk
+
+    def create(self, model, messages, temperature=None, max_tokens=None, stream=False,
+               stream_options=None, **kwargs):
+        # latency_ms models time to first token; token_latency_ms the generation rate
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        response = self._response(model, messages)
+        if stream:
+            return self._stream(response, (stream_options or {}).get('include_usage', False))
+        if self.token_latency_ms:
+            time.sleep(self.token_latency_ms * response.usage.completion_tokens / 1000)
+        return response
+
+    def _response(self, model, messages):
+        question = messages[-1]['content']
+        prompt_tokens = sum(len(message['content'].split()) for message in messages)
+        content = (
+            f"[{model}] Local response to: {question.strip()[:200]}\n"
+            f"Prompt contained {len(messages)} messages and about {prompt_tokens} words of context."
+        )
+        completion_tokens = len(content.split())
+        return SimpleNamespace(
+            choices=[SimpleNamespace(
+                index=0,
+                message=SimpleNamespace(role='assistant', content=content),
+                finish_reason='stop'
+            )],
+            model=model,
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+
+
+class LocalClient:
+    """Offline stand-in for AzureOpenAI"""
+
+    def __init__(self, embedding_latency_ms=LOCAL_EMBEDDING_LATENCY_MS,
+                 chat_latency_ms=LOCAL_CHAT_LATENCY_MS):
+        self.embeddings = LocalEmbeddings(embedding_latency_ms)
+        self.chat = SimpleNamespace(completions=LocalChatCompletions(chat_latency_ms))
+
+
+class LocalAsyncEmbeddings(LocalEmbeddings):
+    async def create(self, model, input, **kwargs):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._response(model, input)
+
+
+class LocalAsyncChatCompletions(LocalChatCompletions):
+    async def _astream(self, response, include_usage=False):
+        for chunk in self._chunks(response, include_usage):
+            if self.token_latency_ms:
+                await asyncio.sleep(self.token_latency_ms / 1000)
+            yield chunk
+
+    async def create(self, model, messages, temperature=None, max_tokens=None, stream=False,
+                     stream_options=None, **kwargs):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        response = self._response(model, messages)
+        if stream:
+            return self._astream(response, (stream_options or {}).get('include_usage', False))
+        if self.token_latency_ms:
+            await asyncio.sleep(self.token_latency_ms * response.usage.completion_tokens / 1000)
+        return response
+
+
+class LocalAsyncClient:
+    """Offline stand-in for AsyncAzureOpenAI"""
+
+    def __init__(self, embedding_latency_ms=LOCAL_EMBEDDING_LATENCY_MS,
+                 chat_latency_ms=LOCAL_CHAT_LATENCY_MS):
+        self.embeddings = LocalAsyncEmbeddings(embedding_latency_ms)
+        self.chat = SimpleNamespace(completions=LocalAsyncChatCompletions(chat_latency_ms))
+
+
+def _azure_options():
+    """Pool and timeout settings shared by the sync and async Azure clients"""
+    import httpx
+
+    return {
+        'azure_endpoint': AZURE_OPENAI_ENDPOINT,
+        'api_key': AZURE_OPENAI_KEY,
+        'api_version': AZURE_API_VERSION,
+        # Retries are done by ResilientClient, against the shared budget
+        'max_retries': 0,
+        'timeout': httpx.Timeout(LLM_CHAT_DEADLINE_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+        'limits': httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS
+        )
+    }
+
+
+@lru_cache(maxsize=None)
+def create_client(provider=LLM_PROVIDER):
+    """Process-wide client for provider (pooled, with deadlines, retries and hedging)"""
+    if provider == "local":
+        return ResilientClient(LocalClient(), budget=RETRY_BUDGET)
+    if provider == "azure":
+        options = _azure_options()
+        limits = options.pop('limits')
+        raw = AzureOpenAI(http_client=openai.DefaultHttpxClient(limits=limits), **options)
+        return ResilientClient(raw, budget=RETRY_BUDGET)
+    raise ValueError(f"Unknown LLM_PROVIDER '{provider}'. Use 'azure' or 'local'")
+
+
+def create_async_client(provider=LLM_PROVIDER):
+    """
+    Async client for provider
+    
+    Not shared process-wide like create_client: an async connection pool
+    belongs to the event loop it was first used on.
+    """
+    if provider == "local":
+        return AsyncResilientClient(LocalAsyncClient(), budget=RETRY_BUDGET)
+    if provider == "azure":
+        options = _azure_options()
+        limits = options.pop('limits')
+        raw = AsyncAzureOpenAI(http_client=openai.DefaultAsyncHttpxClient(limits=limits), **options)
+        return AsyncResilientClient(raw, budget=RETRY_BUDGET)
+    raise ValueError(f"Unknown LLM_PROVIDER '{provider}'. Use 'azure' or 'local'")
+
+
+def embedding_deployment(provider=LLM_PROVIDER):
+    """Model name used for embedding calls and as part of every cache key"""
+    return LOCAL_EMBEDDING_MODEL if provider == "local" else AZURE_EMBEDDING_DEPLOYMENT
+
+
+def chat_deployment(provider=LLM_PROVIDER):
+    return LOCAL_CHAT_MODEL if provider == "local" else AZURE_OPENAI_DEPLOYMENT
@@ -0,0 +1,42 @@
+"""
+Identifier extraction and category inference for procurement questions
+"""
+import re
+
+# Identifier formats used throughout Data/raw
+ID_PATTERNS = {
+    'invoices': re.compile(r"\bINV-\d{4}-\d{3}\b", re.IGNORECASE),
+    'purchase_orders': re.compile(r"\bPO-\d{4}-\d{3}\b", re.IGNORECASE),
+    'suppliers': re.compile(r"\bSUP-\d{3}\b", re.IGNORECASE),
+    'materials': re.compile(r"\b(?:RAW|PKG|EXC)-\d{3}\b", re.IGNORECASE),
+}
+
+# Words that only make sense for one category
+CATEGORY_KEYWORDS = {
+    'invoices': re.compile(r"\binvoices?\b|\bpayment status\b|\bdue date\b", re.IGNORECASE),
+}
+
+
+def extract_identifiers(text):
+    """Return {category: [IDS...]} for every identifier found, upper-cased and de-duplicated"""
+    found = {}
+    for category, pattern in ID_PATTERNS.items():
+        matches = list(dict.fromkeys(match.upper() for match in pattern.findall(text)))
+        if matches:
+            found[category] = matches
+    return found
+
+
+def infer_categories(text):
+    """
+    Categories a question is unambiguously about, or None
+
+    Material codes are not used: a question naming RAW-001 is as likely to be
+    about its POs, invoices or suppliers as about the material record.
+    """
+    categories = set(extract_identifiers(text))
+    categories.discard('materials')
+    for category, pattern in CATEGORY_KEYWORDS.items():
+        if pattern.search(text):
+            categories.add(category)
+    return tuple(sorted(categories)) or None
@@ -3,89 +3,461 @@ Custom RAG engine WITHOUT LangChain
 Pure FAISS + Azure OpenAI
 """
 import sys
+import threading
 from pathlib import Path
-import pickle
 import numpy as np
 import faiss
-from openai import AzureOpenAI
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.cache import QueryEmbeddingCache
+from src.providers import create_client, create_async_client, embedding_deployment
+from src.vector_store import ChunkStore, read_faiss_index, read_current_version, current_store_dir
+from src.index_factory import configure_search, search_parameters
+from src.batching import MicroBatcher
+from src.query_parser import infer_categories
+from src.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from src.tracing import traced, stage, annotate
 from src.config import (
     VECTOR_STORE_DIR,
-    AZURE_OPENAI_ENDPOINT,
-    AZURE_OPENAI_KEY,
-    AZURE_EMBEDDING_DEPLOYMENT,
-    AZURE_API_VERSION,
-    TOP_K_RESULTS
+    TOP_K_RESULTS,
+    FAISS_MMAP,
+    RETRIEVAL_BATCH_MAX_SIZE,
+    RETRIEVAL_BATCH_WINDOW_MS,
+    HYBRID_RETRIEVAL,
+    HYBRID_CANDIDATES,
+    LEXICAL_FILL_MIN_SCORE,
+    STORE_RELOAD_INTERVAL_SECONDS
 )
 
-class RAGEngine:
-    def __init__(self):
-        self.vector_store_dir = VECTOR_STORE_DIR
-        
-        # Initialize Azure OpenAI client
-        self.client = AzureOpenAI(
-            azure_endpoint=AZURE_OPENAI_ENDPOINT,
-            api_key=AZURE_OPENAI_KEY,
-            api_version=AZURE_API_VERSION
-        )
-        self.embedding_deployment = AZURE_EMBEDDING_DEPLOYMENT
-        
-        # Load FAISS index and data
-        self.index = self._load_index()
-        self.chunks = self._load_chunks()
-        self.metadata = self._load_metadata()
+def trace_docs(docs):
+    """Compact form of retrieval results for a trace record"""
+    return [
+        {'chunk_id': doc['chunk_id'], 'score': round(doc['score'], 4), 'match': doc['match']}
+        for doc in docs
+    ]
+
+
+class StoreSnapshot:
+    """
+    One loaded version of the vector store: index, chunks, metadata and
+    lexical index, plus the search state derived from them
+    
+    Never modified after loading except for its lazily filled caches, so
+    a query holding a snapshot is unaffected by a reload.
+    """
     
-    def _load_index(self):
-        index_path = self.vector_store_dir / "index.faiss"
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        index_path = self.directory / "index.faiss"
         if not index_path.exists():
             raise FileNotFoundError(
                 "FAISS index not found. Run embeddings.py first!"
             )
-        return faiss.read_index(str(index_path))
+        self.index = read_faiss_index(index_path, use_mmap=FAISS_MMAP)
+        self.store = ChunkStore(self.directory)
+        self.index_type = self.store.info.get('index', {}).get('index_type', 'flat')
+        configure_search(self.index, self.index_type)
+        self.chunks = self.store.chunks
+        self.metadata = self.store.metadata
+        self.lexical = self._load_lexical_index()
+        self.version = self.store.info.get('version', 'unversioned')
+        self._search_params = {}
+        self._category_masks = {}
     
-    def _load_chunks(self):
-        """Load text chunks"""
-        chunks_path = self.vector_store_dir / "chunks.pkl"
-        with open(chunks_path, 'rb') as f:
-            return pickle.load(f)
+    def _load_lexical_index(self):
+        """Lexical index is optional; without it retrieval is dense-only"""
+        if not LexicalIndex.exists(self.directory):
+            return None
+        return LexicalIndex.load(self.directory)
     
-    def _load_metadata(self):
-        """Load metadata"""
-        metadata_path = self.vector_store_dir / "metadata.pkl"
-        with open(metadata_path, 'rb') as f:
-            return pickle.load(f)
+    def resolve_categories(self, query, category_filter="auto"):
+        """
+        Turn a category filter into a sorted tuple of categories, or None for all
+        
+        Args:
+            category_filter: "auto" to infer from the query, None for no
+                filter, a category name, or a list of category names.
+                An explicit filter with no indexed chunks matches nothing;
+                inferred categories with none fall back to no filter.
+        """
+        if category_filter == "auto":
+            categories = infer_categories(query)
+            if categories is not None and not self._category_mask(categories).any():
+                return None
+            return categories
+        if category_filter is None:
+            return None
+        if isinstance(category_filter, str):
+            category_filter = [category_filter]
+        return tuple(sorted(category_filter))
     
-    def get_embedding(self, text):
-        """Get embedding for query"""
-        response = self.client.embeddings.create(
-            model=self.embedding_deployment,
-            input=text
+    def _category_params(self, categories):
+        """Cached ID-selector search params for a category tuple with indexed chunks"""
+        if categories is None:
+            return None
+        if categories not in self._search_params:
+            ids = np.flatnonzero(self._category_mask(categories)).astype('int64')
+            selector = faiss.IDSelectorBatch(ids)
+            # Keep the selector alive alongside the params that point at it
+            self._search_params[categories] = (
+                search_parameters(self.index, self.index_type, selector),
+                selector
+            )
+        return self._search_params[categories][0]
+    
+    def _category_mask(self, categories):
+        """Cached boolean row mask for lexical search; all False for categories with no chunks"""
+        if categories is None:
+            return None
+        if categories not in self._category_masks:
+            codes = [self.metadata.categories.index(c) for c in categories if c in self.metadata.categories]
+            self._category_masks[categories] = np.isin(self.metadata.category_codes, codes)
+        return self._category_masks[categories]
+    
+    def _result(self, idx, score, match):
+        return {
+            'chunk_id': int(idx),
+            'content': self.chunks[idx],
+            'metadata': self.metadata[idx],
+            'score': float(score),
+            'match': match,
+            'store_version': self.version
+        }
+    
+    def _exact_matches(self, query, k, categories=None):
+        """
+        Resolve documents named by identifiers in the query, no embedding needed
+        
+        Only chunks within categories count. Remaining slots are filled with
+        BM25 hits scoring at least LEXICAL_FILL_MIN_SCORE. Returns None when
+        the query names no indexed identifier in those categories.
+        """
+        if self.lexical is None:
+            return None
+        mask = self._category_mask(categories)
+        chunk_ids = self.lexical.lookup_identifiers(query)
+        if mask is not None:
+            chunk_ids = [idx for idx in chunk_ids if mask[idx]]
+        chunk_ids = chunk_ids[:k]
+        if not chunk_ids:
+            return None
+        
+        filler = [
+            (idx, score) for idx, score in self.lexical.search(query, k + len(chunk_ids), mask=mask)
+            if idx not in chunk_ids and score >= LEXICAL_FILL_MIN_SCORE
+        ][:k - len(chunk_ids)]
+        # All scores are BM25-scale, higher is better; identifier hits sit just above the best filler
+        id_score = max((score for _, score in filler), default=0.0) + 1.0
+        return (
+            [self._result(idx, id_score, 'id') for idx in chunk_ids] +
+            [self._result(idx, score, 'lexical') for idx, score in filler]
         )
-        return response.data[0].embedding
     
-    def retrieve(self, query, k=TOP_K_RESULTS):
-        """Retrieve top-k relevant documents"""
-        # Get query embedding
-        query_embedding = self.get_embedding(query)
-        query_vector = np.array([query_embedding]).astype('float32')
+    def _dense_results(self, query, categories, row_indices, row_distances, k):
+        """Dense hits, fused with BM25 by reciprocal rank when hybrid retrieval is on"""
+        # FAISS pads with -1 when fewer than k vectors match
+        dense = [(int(idx), float(distance)) for idx, distance in zip(row_indices, row_distances) if idx >= 0]
         
-        # Search in FAISS
-        distances, indices = self.index.search(query_vector, k)
+        if self.lexical is None or not HYBRID_RETRIEVAL:
+            return [self._result(idx, distance, 'dense') for idx, distance in dense[:k]]
         
-        # Retrieve chunks
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            results.append({
-                'content': self.chunks[idx],
-                'metadata': self.metadata[idx],
-                'score': float(distance)
-            })
+        lexical = self.lexical.search(query, len(row_indices), mask=self._category_mask(categories))
+        fused = reciprocal_rank_fusion([
+            [idx for idx, _ in dense],
+            [idx for idx, _ in lexical]
+        ])
+        return [self._result(idx, score, 'hybrid') for idx, score in fused[:k]]
+    
+    def resolve_exact(self, queries, k, filters):
+        """Answer identifier queries directly; returns (results, rows still needing dense search)"""
+        all_results = [None] * len(queries)
+        dense_rows = []
+        for i, query in enumerate(queries):
+            exact = self._exact_matches(query, k, filters[i])
+            if exact:
+                all_results[i] = exact
+            else:
+                dense_rows.append(i)
+        return all_results, dense_rows
+    
+    def search_dense(self, queries, k, filters, all_results, dense_rows, embeddings):
+        """Fill all_results[dense_rows] from the index, one search per category filter"""
+        query_vectors = np.array(embeddings).astype('float32')
+        n_candidates = max(k, HYBRID_CANDIDATES) if self.lexical is not None and HYBRID_RETRIEVAL else k
+        
+        groups = {}
+        for position, i in enumerate(dense_rows):
+            groups.setdefault(filters[i], []).append(position)
+        
+        for categories, positions in groups.items():
+            if categories is not None and not self._category_mask(categories).any():
+                # Explicit filter with nothing indexed: no results rather than unfiltered ones
+                for position in positions:
+                    all_results[dense_rows[position]] = []
+                continue
+            params = self._category_params(categories)
+            if params is None:
+                distances, indices = self.index.search(query_vectors[positions], n_candidates)
+            else:
+                distances, indices = self.index.search(query_vectors[positions], n_candidates, params=params)
+            for position, row_indices, row_distances in zip(positions, indices, distances):
+                row = dense_rows[position]
+                all_results[row] = self._dense_results(
+                    queries[row], categories, row_indices, row_distances, k
+                )
+
+
+class RAGEngine:
+    def __init__(self, client=None, async_client=None):
+        self.vector_store_dir = VECTOR_STORE_DIR
+        
+        # Initialize model client (Azure OpenAI or local backend)
+        self.client = client or create_client()
+        # Async client is created on first use by the a* methods
+        self._async_client = async_client
+        self.embedding_deployment = embedding_deployment()
+        self.query_cache = QueryEmbeddingCache(self.embedding_deployment)
+        self.batcher = None
+        
+        # Load the published FAISS index and data; reload() swaps in newer builds
+        self.snapshot = StoreSnapshot(current_store_dir(self.vector_store_dir))
+        self._reload_lock = threading.Lock()
+        self._reload_stop = None
+    
+    # Views of the current snapshot. Retrieval takes the snapshot once per
+    # request instead, so a reload never mixes two versions in one answer.
+    @property
+    def version(self):
+        return self.snapshot.version
+    
+    @property
+    def index(self):
+        return self.snapshot.index
+    
+    @property
+    def chunks(self):
+        return self.snapshot.chunks
+    
+    @property
+    def metadata(self):
+        return self.snapshot.metadata
+    
+    @property
+    def lexical(self):
+        return self.snapshot.lexical
+    
+    def reload(self):
+        """
+        Load the published version if it differs from the one being served
         
-        return results
+        The new snapshot is fully loaded before it replaces the old one in a
+        single assignment; queries already running finish on the old version.
+        
+        Returns:
+            True if a new version was swapped in
+        """
+        with self._reload_lock:
+            published = read_current_version(self.vector_store_dir)
+            if published is None or published == self.snapshot.version:
+                return False
+            snapshot = StoreSnapshot(current_store_dir(self.vector_store_dir))
+            previous = self.snapshot.version
+            self.snapshot = snapshot
+        print(f"🔄 Vector store reloaded: {previous} -> {snapshot.version}")
+        return True
+    
+    def start_auto_reload(self, interval=STORE_RELOAD_INTERVAL_SECONDS):
+        """Check for a newly published version every interval seconds, in a daemon thread"""
+        if self._reload_stop is not None:
+            return
+        self._reload_stop = threading.Event()
+        
+        def poll(stop):
+            while not stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Keep serving the loaded version; retry on the next tick
+                    print(f"⚠️  Vector store reload failed: {str(e)}")
+        
+        threading.Thread(
+            target=poll, args=(self._reload_stop,), name="store-reload", daemon=True
+        ).start()
+    
+    def stop_auto_reload(self):
+        if self._reload_stop is not None:
+            self._reload_stop.set()
+            self._reload_stop = None
+    
+    def get_embedding(self, text):
+        """Get embedding for query, served from the query cache when possible"""
+        return self.get_embeddings([text])[0]
+    
+    def get_embeddings(self, texts):
+        """Get embeddings for several queries with at most one API call"""
+        embeddings = [self.query_cache.get(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        annotate(query_cache_hits=len(texts) - len(missing), query_cache_misses=len(missing))
+        
+        if missing:
+            response = self.client.embeddings.create(
+                model=self.embedding_deployment,
+                input=[texts[i] for i in missing]
+            )
+            for i, item in zip(missing, response.data):
+                embeddings[i] = item.embedding
+                self.query_cache.set(texts[i], item.embedding)
+        
+        return embeddings
+    
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = create_async_client()
+        return self._async_client
+    
+    async def aget_embeddings(self, texts):
+        """Async counterpart of get_embeddings"""
+        embeddings = [self.query_cache.get(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        annotate(query_cache_hits=len(texts) - len(missing), query_cache_misses=len(missing))
+        
+        if missing:
+            response = await self.async_client.embeddings.create(
+                model=self.embedding_deployment,
+                input=[texts[i] for i in missing]
+            )
+            for i, item in zip(missing, response.data):
+                embeddings[i] = item.embedding
+                self.query_cache.set(texts[i], item.embedding)
+        
+        return embeddings
+    
+    def resolve_categories(self, query, category_filter="auto"):
+        """See StoreSnapshot.resolve_categories"""
+        return self.snapshot.resolve_categories(query, category_filter)
+    
+    def _retrieve(self, queries, k, category_filters):
+        """
+        Answer identifier queries directly, then embed the rest at once and
+        run one search per distinct category filter, all on one snapshot
+        """
+        snapshot = self.snapshot
+        filters = [snapshot.resolve_categories(q, f) for q, f in zip(queries, category_filters)]
+        with stage('exact_lookup'):
+            all_results, dense_rows = snapshot.resolve_exact(queries, k, filters)
+        if dense_rows:
+            with stage('embedding'):
+                embeddings = self.get_embeddings([queries[i] for i in dense_rows])
+            with stage('vector_search'):
+                snapshot.search_dense(queries, k, filters, all_results, dense_rows, embeddings)
+        annotate(store_version=snapshot.version)
+        return all_results
+    
+    async def _aretrieve(self, queries, k, category_filters):
+        """Async counterpart of _retrieve; only the embedding call is awaited"""
+        snapshot = self.snapshot
+        filters = [snapshot.resolve_categories(q, f) for q, f in zip(queries, category_filters)]
+        with stage('exact_lookup'):
+            all_results, dense_rows = snapshot.resolve_exact(queries, k, filters)
+        if dense_rows:
+            with stage('embedding'):
+                embeddings = await self.aget_embeddings([queries[i] for i in dense_rows])
+            with stage('vector_search'):
+                snapshot.search_dense(queries, k, filters, all_results, dense_rows, embeddings)
+        annotate(store_version=snapshot.version)
+        return all_results
+    
+    def retrieve_many(self, queries, k=TOP_K_RESULTS, category_filter="auto"):
+        """Retrieve top-k documents for each query with one embedding call"""
+        if not queries:
+            return []
+        return self._retrieve(queries, k, [category_filter] * len(queries))
+    
+    def retrieve(self, query, k=TOP_K_RESULTS, category_filter="auto"):
+        """
+        Retrieve top-k relevant documents
+        
+        By default the search is restricted to the categories the query
+        names (e.g. an INV- number searches only invoice chunks). Queries
+        naming an indexed identifier are answered from the lexical index
+        without an embedding call.
+        
+        Each result's 'match' says how it was found: 'id' or 'lexical'
+        (BM25 score, identifier hits ranked above the lexical ones, higher
+        is better), 'dense' (score is L2 distance) or 'hybrid' (score is
+        the fused reciprocal-rank score, higher is better).
+        """
+        with traced('retrieve', query=query) as trace:
+            with trace.stage('retrieve'):
+                if self.batcher is not None:
+                    docs = self._retrieve_without_batch(query, k, category_filter)
+                    if docs is None:
+                        # Runs on the batcher thread: only the total is timed here
+                        trace.set(micro_batched=True)
+                        docs = self.batcher.submit((query, k, category_filter))
+                else:
+                    docs = self.retrieve_many([query], k, category_filter)[0]
+            trace.set(chunks=trace_docs(docs))
+        return docs
+    
+    async def aretrieve_many(self, queries, k=TOP_K_RESULTS, category_filter="auto"):
+        """Async retrieve_many: the embedding call does not block the event loop"""
+        if not queries:
+            return []
+        return await self._aretrieve(queries, k, [category_filter] * len(queries))
+    
+    async def aretrieve(self, query, k=TOP_K_RESULTS, category_filter="auto"):
+        """Async counterpart of retrieve"""
+        with traced('retrieve', query=query) as trace:
+            with trace.stage('retrieve'):
+                docs = (await self.aretrieve_many([query], k, category_filter))[0]
+            trace.set(chunks=trace_docs(docs))
+        return docs
+    
+    def enable_micro_batching(self, max_batch_size=RETRIEVAL_BATCH_MAX_SIZE,
+                              window_ms=RETRIEVAL_BATCH_WINDOW_MS):
+        """Route retrieve() calls that need an embedding through a micro-batcher shared by concurrent callers"""
+        self.batcher = MicroBatcher(
+            self._retrieve_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=window_ms
+        )
+    
+    def _retrieve_without_batch(self, query, k, category_filter):
+        """
+        Answer on the caller's thread when no embedding call is needed
+        
+        Identifier queries and queries whose embedding is cached do not wait
+        for a batch window or queue behind other batches' embedding calls.
+        Returns None when the query has to go through the batcher.
+        """
+        snapshot = self.snapshot
+        filters = [snapshot.resolve_categories(query, category_filter)]
+        with stage('exact_lookup'):
+            all_results, dense_rows = snapshot.resolve_exact([query], k, filters)
+        if dense_rows:
+            embedding = self.query_cache.get(query)
+            if embedding is None:
+                return None
+            annotate(query_cache_hits=1, query_cache_misses=0)
+            with stage('vector_search'):
+                snapshot.search_dense([query], k, filters, all_results, dense_rows, [embedding])
+        annotate(store_version=snapshot.version)
+        return all_results[0]
+    
+    def _retrieve_batch(self, requests):
+        """Batcher handler: requests are (query, k, category_filter) tuples"""
+        max_k = max(k for _, k, _ in requests)
+        results = self._retrieve(
+            [query for query, _, _ in requests],
+            max_k,
+            [category_filter for _, _, category_filter in requests]
+        )
+        return [docs[:k] for docs, (_, k, _) in zip(results, requests)]
     
-    def retrieve_with_scores(self, query, k=TOP_K_RESULTS):
+    def retrieve_with_scores(self, query, k=TOP_K_RESULTS, category_filter="auto"):
         """Same as retrieve - kept for compatibility"""
-        return self.retrieve(query, k)
\ No newline at end of file
+        return self.retrieve(query, k, category_filter)
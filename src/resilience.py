@@ -0,0 +1,243 @@
+"""
+Deadlines, budgeted retries and hedging for model calls
+
+ResilientClient wraps a pooled client (AzureOpenAI or LocalClient) behind
+the same embeddings.create / chat.completions.create surface. Every call
+gets a deadline covering all of its attempts; retries use jittered backoff
+and are drawn from a RetryBudget shared by the process, so an upstream
+outage cannot multiply the load on it. Embedding calls can optionally be
+hedged: if the first request is slow, a second one races it.
+"""
+import sys
+import time
+import random
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import openai
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import (
+    LLM_MAX_CONNECTIONS,
+    LLM_EMBEDDING_DEADLINE_SECONDS,
+    LLM_CHAT_DEADLINE_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BUDGET_RATIO,
+    LLM_RETRY_BUDGET_RESERVE,
+    EMBEDDING_HEDGE_DELAY_MS
+)
+
+
+def is_retryable(error):
+    """429s, 5xx, timeouts and transport errors are worth retrying; other 4xx are not"""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def retry_after(error):
+    """Seconds requested by the server's Retry-After header, if any"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, error, base=1.0, cap=60.0):
+    """Retry-After if the server sent one, else exponential backoff with jitter"""
+    delay = retry_after(error)
+    if delay is None:
+        delay = min(cap, base * 2 ** attempt) * (0.5 + random.random() / 2)
+    return delay
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries (and hedges) to a fraction of traffic
+
+    Each request earns `ratio` tokens, each retry spends one; `reserve`
+    is both the starting balance and the cap, so a quiet process can still
+    retry a few isolated failures.
+    """
+
+    def __init__(self, ratio=LLM_RETRY_BUDGET_RATIO, reserve=LLM_RETRY_BUDGET_RESERVE):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class _ResilientBase:
+    def __init__(self, raw, budget=None,
+                 max_retries=LLM_MAX_RETRIES,
+                 embedding_deadline=LLM_EMBEDDING_DEADLINE_SECONDS,
+                 chat_deadline=LLM_CHAT_DEADLINE_SECONDS,
+                 hedge_delay_ms=EMBEDDING_HEDGE_DELAY_MS):
+        self.raw = raw
+        self.budget = budget or RetryBudget()
+        self.max_retries = max_retries
+        self.embedding_deadline = embedding_deadline
+        self.chat_deadline = chat_deadline
+        self.hedge_delay = hedge_delay_ms / 1000
+        # batch_*: calls BatchEmbedder makes on self.raw with its own backoff (see count)
+        self.counters = dict.fromkeys(
+            ['requests', 'retries', 'hedges', 'hedge_wins', 'budget_exhausted', 'deadline_exceeded',
+             'batch_requests', 'batch_retries'], 0
+        )
+        self._lock = threading.Lock()
+
+        self.embeddings = SimpleNamespace(create=self._create_embeddings)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_chat))
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def count(self, name):
+        """Record a call made directly on self.raw by a caller with its own retry policy"""
+        self._count(name)
+
+    def _retry_delay(self, attempt, error, deadline):
+        """Backoff before the next attempt, or None if the error should be raised"""
+        if attempt == self.max_retries or not is_retryable(error):
+            return None
+        delay = backoff_delay(attempt, error, base=0.25, cap=8.0)
+        if time.monotonic() + delay >= deadline:
+            self._count('deadline_exceeded')
+            return None
+        if not self.budget.try_spend():
+            self._count('budget_exhausted')
+            return None
+        self._count('retries')
+        return delay
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['retry_budget_tokens'] = round(self.budget.tokens, 2)
+        return stats
+
+
+class ResilientClient(_ResilientBase):
+    """Drop-in for a sync client: deadlines, budgeted retries, hedged embeddings"""
+
+    def __init__(self, raw, **kwargs):
+        super().__init__(raw, **kwargs)
+        self._hedge_pool = None
+
+    def _call(self, create, deadline_seconds, kwargs):
+        deadline = time.monotonic() + deadline_seconds
+        for attempt in range(self.max_retries + 1):
+            try:
+                return create(timeout=max(0.001, deadline - time.monotonic()), **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    def _create_chat(self, **kwargs):
+        self.budget.record_request()
+        self._count('requests')
+        return self._call(self.raw.chat.completions.create, self.chat_deadline, kwargs)
+
+    def _create_embeddings(self, **kwargs):
+        self.budget.record_request()
+        self._count('requests')
+        if self.hedge_delay <= 0:
+            return self._call(self.raw.embeddings.create, self.embedding_deadline, kwargs)
+        return self._hedged(lambda: self._call(self.raw.embeddings.create, self.embedding_deadline, kwargs))
+
+    def _hedged(self, call):
+        """Start call; if it is still running after the hedge delay, race a second copy"""
+        if self._hedge_pool is None:
+            with self._lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = ThreadPoolExecutor(
+                        max_workers=LLM_MAX_CONNECTIONS, thread_name_prefix="llm-hedge"
+                    )
+        primary = self._hedge_pool.submit(call)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done or not self.budget.try_spend():
+            return primary.result()
+
+        self._count('hedges')
+        hedge = self._hedge_pool.submit(call)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedge_wins')
+                    return future.result()
+        # Both copies failed: surface the primary's error
+        return primary.result()
+
+
+class AsyncResilientClient(_ResilientBase):
+    """Drop-in for an async client; the losing hedge is cancelled"""
+
+    async def _call(self, create, deadline_seconds, kwargs):
+        deadline = time.monotonic() + deadline_seconds
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await create(timeout=max(0.001, deadline - time.monotonic()), **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _create_chat(self, **kwargs):
+        self.budget.record_request()
+        self._count('requests')
+        return await self._call(self.raw.chat.completions.create, self.chat_deadline, kwargs)
+
+    async def _create_embeddings(self, **kwargs):
+        self.budget.record_request()
+        self._count('requests')
+        call = lambda: self._call(self.raw.embeddings.create, self.embedding_deadline, kwargs)
+        if self.hedge_delay <= 0:
+            return await call()
+
+        primary = asyncio.ensure_future(call())
+        done, _ = await asyncio.wait([primary], timeout=self.hedge_delay)
+        if done or not self.budget.try_spend():
+            return await primary
+
+        self._count('hedges')
+        hedge = asyncio.ensure_future(call())
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count('hedge_wins')
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
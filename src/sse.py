@@ -0,0 +1,10 @@
+"""
+Server-sent event formatting shared by the Flask (app1.py) and ASGI apps
+"""
+import json
+
+
+def sse_event(payload, event=None):
+    """Format one server-sent event as text (encode it for raw ASGI bodies)"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
@@ -0,0 +1,17 @@
+"""
+Token counting with tiktoken (cl100k_base, shared by ada-002 and gpt-4.x)
+"""
+from functools import lru_cache
+import tiktoken
+
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    return tiktoken.get_encoding(ENCODING_NAME)
+
+
+def count_tokens(text):
+    """Number of tokens in text"""
+    return len(get_encoding().encode(text, disallowed_special=()))
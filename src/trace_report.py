@@ -0,0 +1,127 @@
+"""
+Summarize the per-request trace log
+
+Reads the rotated JSONL files written by src/tracing.py and prints latency
+percentiles per stage, cache hit rates and token usage.
+
+Usage:
+    python src/trace_report.py
+    python src/trace_report.py --kind chat --last 1000
+    python src/trace_report.py --json
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import TRACE_PATH, TRACE_BACKUP_COUNT
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def trace_files(path=TRACE_PATH, backup_count=TRACE_BACKUP_COUNT):
+    """Existing log files, oldest first (requests.jsonl.N ... requests.jsonl)"""
+    path = Path(path)
+    files = [path.with_name(f"{path.name}.{i}") for i in range(backup_count, 0, -1)] + [path]
+    return [f for f in files if f.exists()]
+
+
+def load_traces(path=TRACE_PATH, kind=None, last=None):
+    records = []
+    for file in trace_files(path):
+        with open(file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut off by a crash mid-write
+                    continue
+                if kind is None or record.get('kind') == kind:
+                    records.append(record)
+    return records[-last:] if last else records
+
+
+def latency_summary(values):
+    values = np.asarray(values, dtype=float)
+    summary = {'count': len(values), 'mean_ms': round(float(values.mean()), 3)}
+    for p in PERCENTILES:
+        summary[f'p{p}_ms'] = round(float(np.percentile(values, p)), 3)
+    summary['max_ms'] = round(float(values.max()), 3)
+    return summary
+
+
+def _rate(records, field):
+    flags = [record[field] for record in records if field in record]
+    return round(sum(flags) / len(flags), 4) if flags else None
+
+
+def summarize(records):
+    """Per-stage latency percentiles, cache hit rates and token usage"""
+    stages = {}
+    for record in records:
+        for name, ms in record.get('stages', {}).items():
+            stages.setdefault(name, []).append(ms)
+
+    query_hits = sum(record.get('query_cache_hits', 0) for record in records)
+    query_lookups = query_hits + sum(record.get('query_cache_misses', 0) for record in records)
+    usage = [record['usage'] for record in records if record.get('usage')]
+
+    return {
+        'requests': len(records),
+        'kinds': {kind: sum(1 for r in records if r.get('kind') == kind)
+                  for kind in sorted({r.get('kind') for r in records})},
+        'errors': sum(1 for record in records if 'error' in record),
+        'routed': sum(1 for record in records if 'intent' in record),
+        'total': latency_summary([record['total_ms'] for record in records]),
+        'stages': {name: latency_summary(values) for name, values in stages.items()},
+        'answer_cache_hit_rate': _rate(records, 'answer_cache_hit'),
+        'query_cache_hit_rate': round(query_hits / query_lookups, 4) if query_lookups else None,
+        'avg_prompt_tokens': round(float(np.mean([u['prompt_tokens'] or 0 for u in usage])), 1) if usage else None,
+        'avg_completion_tokens': round(float(np.mean([u['completion_tokens'] or 0 for u in usage])), 1) if usage else None,
+    }
+
+
+def print_summary(summary):
+    kinds = ", ".join(f"{kind}: {count}" for kind, count in summary['kinds'].items())
+    print(f"📊 {summary['requests']} requests ({kinds}), {summary['errors']} errors, "
+          f"{summary['routed']} answered by the intent router")
+    print()
+    header = f"{'stage':<16} {'count':>7} {'mean':>9}" + "".join(f" {f'p{p}':>9}" for p in PERCENTILES) + f" {'max':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(summary['stages'].items()) + [('total', summary['total'])]
+    for name, row in rows:
+        print(f"{name:<16} {row['count']:>7} {row['mean_ms']:>9.2f}"
+              + "".join(f" {row[f'p{p}_ms']:>9.2f}" for p in PERCENTILES)
+              + f" {row['max_ms']:>9.2f}")
+    print()
+    for label, key in [("Answer cache hit rate", 'answer_cache_hit_rate'),
+                       ("Query cache hit rate", 'query_cache_hit_rate'),
+                       ("Avg prompt tokens", 'avg_prompt_tokens'),
+                       ("Avg completion tokens", 'avg_completion_tokens')]:
+        value = summary[key]
+        print(f"{label + ':':<24} {'n/a' if value is None else value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the request trace log")
+    parser.add_argument('--path', default=str(TRACE_PATH))
+    parser.add_argument('--kind', choices=['chat', 'chat_stream', 'retrieve'], help="Only this request kind")
+    parser.add_argument('--last', type=int, help="Only the most recent N requests")
+    parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    records = load_traces(args.path, args.kind, args.last)
+    if not records:
+        print(f"❌ No traces found at {args.path}")
+        sys.exit(1)
+
+    summary = summarize(records)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
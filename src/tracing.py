@@ -0,0 +1,194 @@
+"""
+Per-request trace records written to a rotating JSONL file
+
+A trace collects stage timings (ms), retrieved chunk ids and scores,
+token usage and cache hits for one chat or retrieval request:
+
+    with traced('chat', question=question) as trace:
+        with trace.stage('completion'):
+            ...
+        trace.set(usage=usage_dict(response))
+
+Code deeper in the call (RAGEngine) adds to the active trace through
+stage() and annotate(), which do nothing when no trace is active.
+Summarize the log with: python src/trace_report.py
+"""
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import TRACE_ENABLED, TRACE_PATH, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT
+
+_current = contextvars.ContextVar('procurement_trace', default=None)
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _trace_logger():
+    """Logger writing one JSON record per line, rotated by size"""
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                Path(TRACE_PATH).parent.mkdir(parents=True, exist_ok=True)
+                handler = RotatingFileHandler(
+                    TRACE_PATH, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUP_COUNT, encoding='utf-8'
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("procurement.trace")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+
+def usage_dict(response):
+    """Token usage reported by the API, or None if the response has none"""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return None
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+        'completion_tokens': getattr(usage, 'completion_tokens', None),
+        'total_tokens': getattr(usage, 'total_tokens', None)
+    }
+
+
+class Trace:
+    def __init__(self, kind, **fields):
+        self.record = {
+            'trace_id': uuid.uuid4().hex[:16],
+            'kind': kind,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        }
+        self.record.update(fields)
+        self.stages = {}
+        self._start = time.perf_counter()
+        self._finished = False
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block; repeated stages of the same name add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, (time.perf_counter() - start) * 1000)
+
+    def add_stage(self, name, elapsed_ms):
+        """Record a stage timed by the caller (e.g. across the yields of a stream)"""
+        self.stages[name] = round(self.stages.get(name, 0.0) + elapsed_ms, 3)
+
+    def set(self, **fields):
+        self.record.update(fields)
+
+    @contextmanager
+    def activate(self):
+        """Make this the trace that stage() and annotate() add to, for the block"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def finish(self):
+        """Write the record once; later calls are ignored"""
+        if self._finished:
+            return
+        self._finished = True
+        self.record['total_ms'] = round(self.elapsed_ms(), 3)
+        self.record['stages'] = self.stages
+        _trace_logger().info(json.dumps(self.record, default=str))
+
+
+class NullTrace:
+    """Stand-in when tracing is disabled; every method is a no-op"""
+    record = {}
+    stages = {}
+
+    def elapsed_ms(self):
+        return 0.0
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def add_stage(self, name, elapsed_ms):
+        pass
+
+    def set(self, **fields):
+        pass
+
+    @contextmanager
+    def activate(self):
+        yield self
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+def current_trace():
+    return _current.get()
+
+
+def start_trace(kind, **fields):
+    """New trace, or NULL_TRACE when tracing is disabled; the caller must finish() it"""
+    return Trace(kind, **fields) if TRACE_ENABLED else NULL_TRACE
+
+
+@contextmanager
+def traced(kind, **fields):
+    """
+    Active trace for the block
+
+    Inside another trace the outer one is reused (and finished by its
+    owner), so a retrieval made by the agent lands in the agent's record.
+    """
+    outer = current_trace()
+    if outer is not None:
+        yield outer
+        return
+    trace = start_trace(kind, **fields)
+    try:
+        with trace.activate():
+            yield trace
+    except Exception as e:
+        trace.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        trace.finish()
+
+
+@contextmanager
+def stage(name):
+    """Time a block into the active trace, if any"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
+
+
+def annotate(**fields):
+    """Add fields to the active trace, if any"""
+    trace = current_trace()
+    if trace is not None:
+        trace.set(**fields)
@@ -0,0 +1,262 @@
+"""
+Compact on-disk chunk store opened with mmap, in versioned directories
+
+VECTOR_STORE_DIR holds one directory per build and a pointer file:
+    versions/<version>/ one complete store (files below, plus index.faiss
+                        and the lexical_*.npy arrays of src/lexical_index.py)
+    CURRENT             name of the published version
+
+A build is written to versions/<version>.partial, renamed when complete
+and only then published by atomically replacing CURRENT, so readers never
+see a half-written store.
+
+Layout inside a store directory:
+    chunks.bin          contiguous UTF-8 chunk text
+    chunk_offsets.npy   int64[n + 1] byte offsets into chunks.bin
+    categories.npy      uint8[n] category code per chunk
+    source_ids.npy      int32[n] source file id per chunk
+    sources.json        source file paths, indexed by source id
+    store_info.json     format version, counts and category names
+
+Every process maps the same files, so pages are shared between workers
+and only the rows a query returns are actually read.
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import uuid
+import shutil
+from pathlib import Path
+import numpy as np
+import faiss
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import STORE_KEEP_VERSIONS
+
+STORE_FORMAT_VERSION = 1
+CATEGORIES = ['materials', 'suppliers', 'purchase_orders', 'invoices']
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+PARTIAL_SUFFIX = ".partial"
+
+
+def new_version():
+    """Sortable, unique build name; caches keyed on retrieval results include it"""
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def staging_dir(root, version):
+    """Directory a build of version is written to before it is complete"""
+    return Path(root) / VERSIONS_DIR / f"{version}{PARTIAL_SUFFIX}"
+
+
+def read_current_version(root):
+    """Published version name, or None if nothing was published yet"""
+    try:
+        return (Path(root) / CURRENT_FILE).read_text(encoding='utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_store_dir(root):
+    """
+    Directory of the published store
+
+    Falls back to root itself for stores written before versioning.
+    """
+    root = Path(root)
+    version = read_current_version(root)
+    if version is None:
+        return root
+    return root / VERSIONS_DIR / version
+
+
+def publish_version(root, version):
+    """
+    Make a completely written staging directory the current store
+
+    The directory rename and the pointer replacement are both atomic, so
+    a reader sees either the previous version or the new one.
+    """
+    root = Path(root)
+    final = root / VERSIONS_DIR / version
+    os.replace(staging_dir(root, version), final)
+
+    pointer = root / f"{CURRENT_FILE}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, root / CURRENT_FILE)
+    return final
+
+
+def prune_versions(root, keep=STORE_KEEP_VERSIONS):
+    """
+    Delete old published versions, keeping the newest `keep` and CURRENT
+
+    Processes still serving a deleted version keep working: their files
+    stay readable until closed (on Windows the delete is simply skipped).
+    """
+    versions_dir = Path(root) / VERSIONS_DIR
+    if not versions_dir.exists():
+        return []
+    current = read_current_version(root)
+    published = sorted(
+        path.name for path in versions_dir.iterdir()
+        if path.is_dir() and not path.name.endswith(PARTIAL_SUFFIX)
+    )
+    removed = []
+    for name in published[:-keep] if keep > 0 else published:
+        if name == current:
+            continue
+        shutil.rmtree(versions_dir / name, ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def write_chunk_store(directory, chunks, metadata, extra_info=None, version=None):
+    """Write chunks and their metadata in the mmap-friendly layout"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    encoded = [chunk.encode('utf-8') for chunk in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    offsets[1:] = np.cumsum([len(blob) for blob in encoded])
+    with open(directory / "chunks.bin", 'wb') as f:
+        for blob in encoded:
+            f.write(blob)
+    np.save(directory / "chunk_offsets.npy", offsets)
+
+    categories = list(CATEGORIES)
+    sources = []
+    source_ids = {}
+    category_codes = np.zeros(len(metadata), dtype='uint8')
+    source_codes = np.zeros(len(metadata), dtype='int32')
+    for i, meta in enumerate(metadata):
+        if meta['category'] not in categories:
+            categories.append(meta['category'])
+        category_codes[i] = categories.index(meta['category'])
+        if meta['source'] not in source_ids:
+            source_ids[meta['source']] = len(sources)
+            sources.append(meta['source'])
+        source_codes[i] = source_ids[meta['source']]
+    np.save(directory / "categories.npy", category_codes)
+    np.save(directory / "source_ids.npy", source_codes)
+
+    with open(directory / "sources.json", 'w', encoding='utf-8') as f:
+        json.dump(sources, f)
+
+    info = {
+        'format_version': STORE_FORMAT_VERSION,
+        # Changes on every build; caches keyed on retrieval results include it
+        'version': version or new_version(),
+        'count': len(chunks),
+        'categories': categories,
+        'source_count': len(sources)
+    }
+    info.update(extra_info or {})
+    with open(directory / "store_info.json", 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def read_store_info(directory):
+    with open(Path(directory) / "store_info.json", 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_faiss_index(path, use_mmap=False):
+    """Read a FAISS index, optionally memory-mapped and read-only"""
+    if use_mmap:
+        return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    return faiss.read_index(str(path))
+
+
+class ChunkTexts:
+    """Sequence view over chunks.bin; decodes a chunk only when indexed"""
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        start, end = self._offsets[idx], self._offsets[idx + 1]
+        if self._blob is None:
+            return ""
+        return self._blob[start:end].decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ChunkMetadata:
+    """Sequence view rebuilding the per-chunk metadata dict from columns"""
+
+    def __init__(self, category_codes, source_ids, categories, sources):
+        self.category_codes = category_codes
+        self.source_ids = source_ids
+        self.categories = categories
+        self.sources = sources
+
+    def __len__(self):
+        return len(self.category_codes)
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        source = self.sources[self.source_ids[idx]]
+        return {
+            'source': source,
+            'category': self.categories[self.category_codes[idx]],
+            'filename': Path(source).name
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ChunkStore:
+    """Read-only, memory-mapped view of a written chunk store"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        info_path = self.directory / "store_info.json"
+        if not info_path.exists():
+            raise FileNotFoundError(
+                "Chunk store not found. Run embeddings.py first!"
+            )
+        self.info = read_store_info(self.directory)
+
+        offsets = np.load(self.directory / "chunk_offsets.npy", mmap_mode='r')
+        blob = None
+        self._file = open(self.directory / "chunks.bin", 'rb')
+        # mmap refuses zero-length files
+        if offsets[-1] > 0:
+            blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.chunks = ChunkTexts(blob, offsets)
+
+        with open(self.directory / "sources.json", 'r', encoding='utf-8') as f:
+            sources = json.load(f)
+        self.metadata = ChunkMetadata(
+            np.load(self.directory / "categories.npy", mmap_mode='r'),
+            np.load(self.directory / "source_ids.npy", mmap_mode='r'),
+            self.info['categories'],
+            sources
+        )
+
+    def __len__(self):
+        return len(self.chunks)
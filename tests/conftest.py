@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Add project root to path, as the application modules do
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,43 @@
+"""
+A failing item in a micro-batch only fails its own caller
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from src.batching import MicroBatcher
+
+
+def test_failure_is_isolated_to_its_item():
+    batch_sizes = []
+    lock = threading.Lock()
+
+    def handler(items):
+        with lock:
+            batch_sizes.append(len(items))
+        if 3 in items:
+            raise ValueError("bad item")
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=8, max_wait_ms=200)
+
+    def call(item):
+        try:
+            return batcher.submit(item)
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(call, range(8)))
+
+    assert max(batch_sizes) > 1
+    assert results == [0, 2, 4, "bad item", 8, 10, 12, 14]
+
+
+def test_single_item_failure_is_raised():
+    def handler(items):
+        raise RuntimeError("down")
+
+    batcher = MicroBatcher(handler, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="down"):
+        batcher.submit(1)
@@ -0,0 +1,33 @@
+"""
+RecordChunker never emits a chunk over its token budget
+"""
+import random
+import pytest
+
+from src.chunker import RecordChunker
+from src.tokenizer import count_tokens
+
+WORDS = ['alpha', 'beta', 'PO-2024-001', 'Rp 1,000', 'Status:', 'Pending', 'été', '50%']
+
+
+def random_record(rng, max_tokens):
+    words = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+    # Title blocks and sections both sometimes larger than the whole budget
+    title = words(rng.randint(1, 3 * max_tokens)) + "\n" + words(rng.randint(1, max_tokens))
+    sections = [f"SECTION {i}\n" + words(rng.randint(1, 2 * max_tokens)) for i in range(rng.randint(1, 8))]
+    return "\n\n".join([title] + sections)
+
+
+@pytest.mark.parametrize('max_tokens', [32, 64, 128, 512])
+def test_chunks_stay_within_max_tokens(max_tokens):
+    rng = random.Random(max_tokens)
+    chunker = RecordChunker(max_tokens=max_tokens, overlap_tokens=min(50, max_tokens // 4))
+    for _ in range(50):
+        chunks = chunker.split(random_record(rng, max_tokens))
+        assert chunks
+        assert max(count_tokens(chunk) for chunk in chunks) <= max_tokens
+
+
+def test_record_within_budget_is_one_chunk():
+    record = "PURCHASE ORDER\nPO Number: PO-2024-001\n\nLINE ITEM\nQuantity: 10 KG"
+    assert RecordChunker(max_tokens=512).split(record) == [record]
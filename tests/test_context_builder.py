@@ -0,0 +1,16 @@
+from src.chunker import RecordChunker
+from src.context_builder import merge_windows
+
+
+def test_merge_keeps_lines_repeated_in_different_sections():
+    record = (
+        "PURCHASE ORDER\nPO Number: PO-1\n\n"
+        "LINE ITEM\nUnit: Unit\nStatus: Pending\n" + "Note: x\n" * 15 + "\n"
+        "RECEIPT\nUnit: Unit\nStatus: Pending\n" + "Note: y\n" * 15 + "\n"
+        "PAYMENT\nStatus: Pending"
+    )
+    chunks = RecordChunker(max_tokens=80, overlap_tokens=10).split(record)
+    assert len(chunks) > 1
+    # Rank order is not chunk order
+    merged = merge_windows(list(enumerate(chunks))[::-1])
+    assert merged == "\n\n".join(RecordChunker.sections(record))
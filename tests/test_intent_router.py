@@ -0,0 +1,17 @@
+from src.intent_router import extract_quantity, classify
+
+
+def test_quantity_needs_a_unit_or_a_quantity_word():
+    assert extract_quantity("suggest a PO for 5000 of PKG-002") == 5000
+    assert extract_quantity("create a PO for 2,000 kg of RAW-001") == 2000
+    assert extract_quantity("draft PO RAW-001 100 units") == 100
+
+
+def test_durations_years_and_bare_numbers_are_not_quantities():
+    assert extract_quantity("order PKG-005 in 2 weeks") is None
+    assert extract_quantity("create PO RAW-001 for 2024") is None
+    assert extract_quantity("suggest a PO RAW-001, 500") is None
+
+
+def test_repeated_keyword_counts_once():
+    assert dict(classify("trend trend trend RAW-001"))['price_trend'] == 3
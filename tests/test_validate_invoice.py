@@ -0,0 +1,71 @@
+"""
+Single-invoice and bulk 3-way matching must reach the same verdict
+"""
+import io
+from pathlib import Path
+import pandas as pd
+import pytest
+
+from src.data_store import ProcurementDataStore
+from use_cases.validate_invoice import InvoiceValidator, STATUS_CHECKS, read_invoice_csv
+
+SAMPLE_RAW_DIR = Path(__file__).parent.parent / "Data" / "raw"
+
+
+def make_store(invoices, pos):
+    return ProcurementDataStore(tables={
+        'invoices': pd.DataFrame(invoices),
+        'purchase_orders': pd.DataFrame(pos).astype({'received_quantity': 'Int32'}),
+    })
+
+
+def invoice(number, po_number, quantity=10, price=100):
+    return {
+        'invoice_number': number, 'po_number': po_number, 'supplier_id': 'SUP-001',
+        'supplier_name': 'PT Test', 'material_code': 'RAW-001', 'line_item_description': 'Test',
+        'quantity_invoiced': quantity, 'unit_price_idr': price, 'total_invoice_idr': quantity * price,
+        'due_date': pd.Timestamp('2024-01-31'),
+    }
+
+
+def po(number, quantity=10, price=100, received=10):
+    return {
+        'po_number': number, 'supplier_id': 'SUP-001', 'material_code': 'RAW-001', 'quantity': quantity,
+        'unit_price_idr': price, 'total_amount_idr': quantity * price, 'received_quantity': received,
+    }
+
+
+def assert_same_verdicts(validator):
+    bulk = validator.validate_all().set_index('invoice_number')
+    for number, row in bulk.iterrows():
+        single = validator.validate(number)
+        if row['status'] == "PO NOT FOUND":
+            assert 'error' in single
+            continue
+        assert single['status'] == row['status'], number
+        for check in STATUS_CHECKS:
+            assert single['checks'][check] == row[check], (number, check)
+
+
+@pytest.mark.skipif(not SAMPLE_RAW_DIR.exists(), reason="sample data not available")
+def test_single_and_bulk_agree_on_sample_invoices():
+    assert_same_verdicts(InvoiceValidator(ProcurementDataStore(SAMPLE_RAW_DIR)))
+
+
+def test_goods_receipt_decides_status_in_both_paths():
+    validator = InvoiceValidator(make_store(
+        [invoice('INV-1', 'PO-1'), invoice('INV-2', 'PO-2'), invoice('INV-3', 'PO-3'), invoice('INV-4', 'PO-X')],
+        [po('PO-1'), po('PO-2', received=8), po('PO-3', received=None)],
+    ))
+    assert_same_verdicts(validator)
+    assert validator.validate('INV-1')['status'] == "APPROVED"
+    assert validator.validate('INV-2')['status'] == "REVIEW REQUIRED"
+    assert validator.validate('INV-3')['status'] == "REVIEW REQUIRED"
+
+
+def test_read_invoice_csv_rejects_bad_amounts():
+    header = "invoice_number,po_number,supplier_id,material_code,quantity_invoiced,unit_price_idr,total_invoice_idr\n"
+    with pytest.raises(ValueError, match="quantity_invoiced"):
+        read_invoice_csv(io.StringIO(header + "INV-1,PO-1,SUP-001,RAW-001,abc,100,1000\n"))
+    invoices = read_invoice_csv(io.StringIO(header + "INV-1,PO-1,SUP-001,RAW-001,10,100,1000\n"))
+    assert invoices['quantity_invoiced'].tolist() == [10]
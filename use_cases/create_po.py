@@ -5,56 +5,114 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import pandas as pd
-from src.config import RAW_DATA_DIR, MANAGER_APPROVAL_LIMIT, VAT_RATE
+import threading
+import numpy as np
+from src.config import (
+    MANAGER_APPROVAL_LIMIT,
+    VAT_RATE,
+    SUPPLIER_SCORE_ON_TIME_WEIGHT,
+    SUPPLIER_SCORE_QUALITY_WEIGHT
+)
+from src.data_store import get_data_store
 
 
-import pandas as pd
-from src.config import RAW_DATA_DIR, MANAGER_APPROVAL_LIMIT, VAT_RATE
+def supplier_scores(suppliers):
+    """Performance score (0-100) per supplier; the only place the ranking formula lives"""
+    return (
+        suppliers['on_time_delivery_percent'] * SUPPLIER_SCORE_ON_TIME_WEIGHT +
+        (100 - suppliers['defect_rate_percent']) * SUPPLIER_SCORE_QUALITY_WEIGHT
+    )
+
+
+def required_approver(total):
+    """Approval tier for PO totals in IDR (scalar or array): Manager up to MANAGER_APPROVAL_LIMIT, else Director"""
+    return np.where(np.asarray(total) > MANAGER_APPROVAL_LIMIT, "Director", "Manager")
+
+
+class SupplierRanking:
+    """
+    Material category -> suppliers specialised in it, best score first
+    
+    Built from one version of suppliers.csv; categories not seen at build
+    time are ranked on first use and kept.
+    """
+    
+    def __init__(self, suppliers, categories=(), version=None):
+        self.version = version
+        self._scored = suppliers.assign(score=supplier_scores(suppliers))
+        self._lock = threading.Lock()
+        self.by_category = {category: self._rank(category) for category in categories}
+    
+    def _rank(self, category):
+        specialization = self._scored['category_specialization'].astype(str)
+        suitable = self._scored[specialization.str.contains(category, regex=False)]
+        return suitable.sort_values('score', ascending=False).to_dict('records')
+    
+    def ranked(self, category):
+        """Supplier rows (dicts with a 'score') for category, best first; empty if none"""
+        ranked = self.by_category.get(category)
+        if ranked is None:
+            with self._lock:
+                ranked = self.by_category.setdefault(category, self._rank(category))
+        return ranked
+    
+    def best(self, category):
+        """Best supplier for category, or None"""
+        ranked = self.ranked(category)
+        return ranked[0] if ranked else None
+
 
 class POCreator:
-    def __init__(self):
-        self.materials_df = pd.read_csv(RAW_DATA_DIR / "materials.csv")
-        self.suppliers_df = pd.read_csv(RAW_DATA_DIR / "suppliers.csv")
+    def __init__(self, data_store=None):
+        # Tables are shared with the other use cases (see src/data_store.py)
+        self.data_store = data_store or get_data_store()
+        self._ranking = None
+    
+    # Read through the store so refreshed tables are picked up
+    @property
+    def materials_df(self):
+        return self.data_store['materials']
+    
+    @property
+    def suppliers_df(self):
+        return self.data_store['suppliers']
+    
+    @property
+    def ranking(self):
+        """Supplier ranking, rebuilt only when suppliers.csv has been reloaded"""
+        suppliers = self.data_store.table('suppliers')
+        ranking = self._ranking
+        if ranking is None or ranking.version != suppliers.version:
+            categories = self.materials_df['category'].astype(str).unique()
+            ranking = SupplierRanking(suppliers.frame, categories, suppliers.version)
+            self._ranking = ranking
+        return ranking
     
     def suggest_po(self, material_code: str, quantity: int):
         """
         Suggest best supplier and create draft PO
         """
-        # Get material info
-        material = self.materials_df[self.materials_df['material_code'] == material_code]
+        # Get material info (hash lookup, see ProcurementDataStore.get)
+        material = self.data_store.get('materials', material_code)
         
-        if material.empty:
+        if material is None:
             return {"error": f"Material {material_code} not found"}
         
-        material = material.iloc[0]
-        
-        # Find suitable suppliers
-        suitable_suppliers = self.suppliers_df[
-            self.suppliers_df['category_specialization'].str.contains(material['category'])
-        ]
+        # Best supplier for the category, by on-time delivery and defect rate (precomputed)
+        best_supplier = self.ranking.best(material['category'])
         
-        if suitable_suppliers.empty:
+        if best_supplier is None:
             return {"error": "No suitable suppliers found"}
         
-        # Rank by rating and on-time delivery
-        suitable_suppliers['score'] = (
-            suitable_suppliers['on_time_delivery_percent'] * 0.6 +
-            (100 - suitable_suppliers['defect_rate_percent']) * 0.4
-        )
-        best_supplier = suitable_suppliers.sort_values('score', ascending=False).iloc[0]
-        
         # Calculate pricing
-        unit_price = material['standard_price']
+        # int32 column: widen before multiplying
+        unit_price = int(material['standard_price'])
         subtotal = quantity * unit_price
         tax = int(subtotal * VAT_RATE)
         total = subtotal + tax
         
         # Determine approval level
-        if total > MANAGER_APPROVAL_LIMIT:
-            approver = "Director"
-        else:
-            approver = "Manager"
+        approver = str(required_approver(total))
         
         return {
             "material_code": material_code,
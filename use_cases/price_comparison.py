@@ -5,30 +5,41 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import pandas as pd
-from src.config import RAW_DATA_DIR
-
-
-import pandas as pd
-from src.config import RAW_DATA_DIR
+from src.data_store import get_data_store
 
 class PriceComparator:
-    def __init__(self):
-        self.materials_df = pd.read_csv(RAW_DATA_DIR / "materials.csv")
-        self.suppliers_df = pd.read_csv(RAW_DATA_DIR / "suppliers.csv")
-        self.pos_df = pd.read_csv(RAW_DATA_DIR / "purchase_orders.csv")
-        self.price_history_df = pd.read_csv(RAW_DATA_DIR / "price_history.csv")
+    def __init__(self, data_store=None):
+        # Tables are shared with the other use cases (see src/data_store.py)
+        self.data_store = data_store or get_data_store()
+    
+    # Read through the store so refreshed tables are picked up
+    @property
+    def materials_df(self):
+        return self.data_store['materials']
+    
+    @property
+    def suppliers_df(self):
+        return self.data_store['suppliers']
+    
+    @property
+    def pos_df(self):
+        return self.data_store['purchase_orders']
+    
+    @property
+    def price_history_df(self):
+        return self.data_store['price_history']
     
     def compare_suppliers(self, material_code: str):
         """Compare prices across all suppliers for a material"""
         # Get recent POs for this material
-        material_pos = self.pos_df[self.pos_df['material_code'] == material_code]
+        material_pos = self.data_store.group('purchase_orders', material_code)
         
         if material_pos.empty:
             return {"error": f"No purchase history for {material_code}"}
         
         # Group by supplier
-        supplier_prices = material_pos.groupby('supplier_name').agg({
+        # observed=True: only suppliers present, not every category of the column
+        supplier_prices = material_pos.groupby('supplier_name', observed=True).agg({
             'unit_price_idr': ['mean', 'min', 'max', 'count']
         }).round(0)
         
@@ -44,9 +55,7 @@ class PriceComparator:
     
     def price_trend(self, material_code: str):
         """Show price trend over time"""
-        history = self.price_history_df[
-            self.price_history_df['material_code'] == material_code
-        ].sort_values('year_month')
+        history = self.data_store.group('price_history', material_code).sort_values('year_month')
         
         if history.empty:
             return {"error": f"No price history for {material_code}"}
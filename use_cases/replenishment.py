@@ -0,0 +1,165 @@
+"""
+Use Case 4: Bulk replenishment run
+
+One vectorized pass over materials.csv: every material at or below its
+reorder point gets a draft PO with an order quantity, the best supplier
+for its category (POCreator's ranking), VAT and the approval tier.
+
+Usage:
+    python use_cases/replenishment.py
+    python use_cases/replenishment.py --category Packaging --output drafts.csv
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from src.config import VAT_RATE, REPLENISHMENT_ORDER_UP_TO_FACTOR
+from src.data_store import get_data_store
+from use_cases.create_po import POCreator, required_approver
+
+DRAFT_COLUMNS = [
+    'material_code', 'material_name', 'category', 'unit', 'current_stock', 'reorder_point',
+    'min_stock_level', 'order_quantity', 'urgent', 'supplier_id', 'supplier_name', 'supplier_score',
+    'lead_time_days', 'expected_delivery', 'payment_terms', 'unit_price', 'subtotal', 'tax',
+    'total_amount', 'required_approver'
+]
+
+
+class ReplenishmentPlanner:
+    def __init__(self, data_store=None, po_creator=None):
+        # Tables are shared with the other use cases (see src/data_store.py)
+        self.data_store = data_store or get_data_store()
+        self.po_creator = po_creator or POCreator(self.data_store)
+
+    def _best_suppliers(self, categories):
+        """Best supplier per category as a frame indexed by category (from the precomputed ranking)"""
+        ranking = self.po_creator.ranking
+        rows = {}
+        for category in categories:
+            best = ranking.best(category)
+            if best is not None:
+                rows[category] = {
+                    'supplier_id': best['supplier_id'],
+                    'supplier_name': best['supplier_name'],
+                    'supplier_score': round(best['score'], 1),
+                    'lead_time_days': int(best['lead_time_days']),
+                    'payment_terms': f"Net {int(best['payment_terms_days'])}",
+                }
+        columns = ['supplier_id', 'supplier_name', 'supplier_score', 'lead_time_days', 'payment_terms']
+        return pd.DataFrame.from_dict(rows, orient='index', columns=columns)
+
+    def run(self, materials=None, category=None, today=None):
+        """
+        Draft POs for every material at or below its reorder point
+
+        Order quantity tops stock up to REPLENISHMENT_ORDER_UP_TO_FACTOR x
+        max(reorder point, min stock level). Materials below min stock
+        level are flagged urgent; ones with no supplier for their category
+        are kept with an empty supplier.
+
+        Args:
+            materials: materials frame (default: the store's materials.csv)
+            category: only materials of this category
+            today: order date for expected delivery (default: today)
+
+        Returns:
+            DataFrame with DRAFT_COLUMNS, urgent first then by total amount
+        """
+        materials = self.data_store['materials'] if materials is None else materials
+        if category is not None:
+            materials = materials[materials['category'].astype(str) == category]
+
+        stock = materials['current_stock'].to_numpy(dtype=np.int64)
+        reorder_point = materials['reorder_point'].to_numpy(dtype=np.int64)
+        due = stock <= reorder_point
+        items = materials[due]
+        stock, reorder_point = stock[due], reorder_point[due]
+        min_stock = items['min_stock_level'].to_numpy(dtype=np.int64)
+
+        target = np.ceil(np.maximum(reorder_point, min_stock) * REPLENISHMENT_ORDER_UP_TO_FACTOR).astype(np.int64)
+        quantity = np.maximum(target - stock, 1)
+        unit_price = items['standard_price'].to_numpy(dtype=np.int64)
+        subtotal = quantity * unit_price
+        # Same rounding as POCreator.suggest_po: int(subtotal * VAT_RATE)
+        tax = np.floor(subtotal * VAT_RATE).astype(np.int64)
+        total = subtotal + tax
+
+        categories = items['category'].astype(str).to_numpy()
+        drafts = pd.DataFrame({
+            'material_code': items['material_code'].astype(str).to_numpy(),
+            'material_name': items['material_name'].astype(str).to_numpy(),
+            'category': categories,
+            'unit': items['unit_of_measure'].astype(str).to_numpy(),
+            'current_stock': stock,
+            'reorder_point': reorder_point,
+            'min_stock_level': min_stock,
+            'order_quantity': quantity,
+            'urgent': stock < min_stock,
+            'unit_price': unit_price,
+            'subtotal': subtotal,
+            'tax': tax,
+            'total_amount': total,
+            'required_approver': required_approver(total),
+        })
+        drafts = drafts.join(self._best_suppliers(pd.unique(categories)), on='category')
+
+        today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+        delivery = today + pd.to_timedelta(drafts['lead_time_days'], unit='D')
+        drafts['expected_delivery'] = delivery.dt.strftime('%Y-%m-%d')
+        drafts['lead_time_days'] = drafts['lead_time_days'].astype('Int64')
+
+        drafts = drafts[DRAFT_COLUMNS].sort_values(['urgent', 'total_amount'], ascending=[False, False])
+        return drafts.reset_index(drop=True)
+
+    @staticmethod
+    def summarize(drafts):
+        """Counts and IDR totals of a replenishment run, by approver and supplier"""
+        by_approver = drafts.groupby('required_approver')['total_amount'].agg(['count', 'sum'])
+        by_supplier = drafts.groupby('supplier_name')['total_amount'].agg(['count', 'sum'])
+        return {
+            "drafts": len(drafts),
+            "urgent": int(drafts['urgent'].sum()),
+            "without_supplier": int(drafts['supplier_id'].isna().sum()),
+            "total_amount": int(drafts['total_amount'].sum()),
+            "by_approver": {name: {"count": int(row['count']), "total_amount": int(row['sum'])}
+                            for name, row in by_approver.iterrows()},
+            "by_supplier": {name: {"count": int(row['count']), "total_amount": int(row['sum'])}
+                            for name, row in by_supplier.iterrows()},
+        }
+
+    def report(self, drafts):
+        """Summary and draft POs as JSON-safe dicts (missing values as None)"""
+        records = drafts.astype(object).where(drafts.notna(), None).to_dict('records')
+        return {"summary": self.summarize(drafts), "drafts": records}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Draft POs for every material at or below its reorder point")
+    parser.add_argument('--category', help="Only this material category (e.g. Packaging)")
+    parser.add_argument('--output', help="Write the drafts to a .csv or .json file")
+    args = parser.parse_args()
+
+    planner = ReplenishmentPlanner()
+    drafts = planner.run(category=args.category)
+    summary = planner.summarize(drafts)
+
+    print(f"📦 {summary['drafts']} draft POs ({summary['urgent']} urgent, "
+          f"{summary['without_supplier']} without supplier), total Rp {summary['total_amount']:,}")
+    for approver, row in summary['by_approver'].items():
+        print(f"   {approver:<10} {row['count']:>6} POs   Rp {row['total_amount']:,}")
+    if len(drafts):
+        print()
+        print(drafts[['material_code', 'material_name', 'order_quantity', 'unit', 'supplier_id',
+                      'total_amount', 'required_approver', 'urgent']].to_string(index=False))
+
+    if args.output:
+        if args.output.endswith('.json'):
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(planner.report(drafts), f, indent=2)
+        else:
+            drafts.to_csv(args.output, index=False)
+        print(f"\n💾 Saved drafts to {args.output}")
@@ -2,49 +2,72 @@
 Use Case 2: Validate Invoice against PO
 """
 import sys
+import json
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import numpy as np
 import pandas as pd
-from src.config import RAW_DATA_DIR
+from src.config import INVOICE_BATCH_CHUNK_ROWS
+from src.data_store import TABLE_SCHEMAS, get_data_store, format_date
 
-import pandas as pd
-from src.config import RAW_DATA_DIR
+# Columns the bulk matcher needs from each side
+INVOICE_COLUMNS = ['invoice_number', 'po_number', 'supplier_id', 'material_code',
+                   'quantity_invoiced', 'unit_price_idr', 'total_invoice_idr']
+# Integer columns the matcher compares; an upload with anything else in them is rejected
+INVOICE_AMOUNT_COLUMNS = ['quantity_invoiced', 'unit_price_idr', 'total_invoice_idr']
+PO_COLUMNS = ['po_number', 'supplier_id', 'material_code', 'quantity',
+              'unit_price_idr', 'total_amount_idr', 'received_quantity']
+# Checks that decide APPROVED vs REVIEW REQUIRED, in validate and in bulk runs
+# alike: never approve paying for more than was received
+STATUS_CHECKS = ['quantity_match', 'price_match', 'total_match', 'receipt_match']
 
 class InvoiceValidator:
-    def __init__(self):
-        self.invoices_df = pd.read_csv(RAW_DATA_DIR / "invoices.csv")
-        self.pos_df = pd.read_csv(RAW_DATA_DIR / "purchase_orders.csv")
+    def __init__(self, data_store=None):
+        # Tables are shared with the other use cases (see src/data_store.py)
+        self.data_store = data_store or get_data_store()
+        self._pos_for_matching = (None, None)
+    
+    # Read through the store so refreshed tables are picked up
+    @property
+    def invoices_df(self):
+        return self.data_store['invoices']
+    
+    @property
+    def pos_df(self):
+        return self.data_store['purchase_orders']
     
     def validate(self, invoice_number: str):
         """
         3-way matching: Invoice vs PO
         """
-        # Get invoice
-        invoice = self.invoices_df[self.invoices_df['invoice_number'] == invoice_number]
+        # Get invoice (hash lookup, see ProcurementDataStore.get)
+        invoice = self.data_store.get('invoices', invoice_number)
         
-        if invoice.empty:
+        if invoice is None:
             return {"error": f"Invoice {invoice_number} not found"}
         
-        invoice = invoice.iloc[0]
-        
         # Get corresponding PO
-        po = self.pos_df[self.pos_df['po_number'] == invoice['po_number']]
+        po = self.data_store.get('purchase_orders', invoice['po_number'])
         
-        if po.empty:
+        if po is None:
             return {"error": f"PO {invoice['po_number']} not found"}
         
-        po = po.iloc[0]
+        # <NA> until the goods are received (bool(x <= pd.NA) raises)
+        received = po['received_quantity']
         
         # Perform checks
         checks = {
             "invoice_number": invoice_number,
             "po_number": invoice['po_number'],
-            "supplier_match": invoice['supplier_id'] == po['supplier_id'],
-            "material_match": invoice['material_code'] == po['material_code'],
-            "quantity_match": invoice['quantity_invoiced'] == po['quantity'],
-            "price_match": invoice['unit_price_idr'] == po['unit_price_idr'],
-            "total_match": invoice['total_invoice_idr'] == po['total_amount_idr'],
+            # bool(): numpy bools are not JSON serializable
+            "supplier_match": bool(invoice['supplier_id'] == po['supplier_id']),
+            "material_match": bool(invoice['material_code'] == po['material_code']),
+            "quantity_match": bool(invoice['quantity_invoiced'] == po['quantity']),
+            "price_match": bool(invoice['unit_price_idr'] == po['unit_price_idr']),
+            "total_match": bool(invoice['total_invoice_idr'] == po['total_amount_idr']),
+            # Goods receipt: never pay for more than was received
+            "receipt_match": bool(not pd.isna(received) and invoice['quantity_invoiced'] <= received),
         }
         
         # Calculate discrepancies
@@ -62,8 +85,13 @@ class InvoiceValidator:
             diff = invoice['total_invoice_idr'] - po['total_amount_idr']
             discrepancies.append(f"Total amount mismatch: Rp {diff:,}")
         
+        if pd.isna(received):
+            discrepancies.append(f"Goods receipt missing: nothing received yet against {invoice['po_number']}")
+        elif not checks['receipt_match']:
+            discrepancies.append(f"Goods receipt mismatch: Invoice has {invoice['quantity_invoiced']} but only {received} received")
+        
         # Overall status
-        if all([checks['quantity_match'], checks['price_match'], checks['total_match']]):
+        if all(checks[name] for name in STATUS_CHECKS):
             status = "APPROVED"
             recommendation = "Invoice matches PO. Recommend approval for payment."
         else:
@@ -80,6 +108,169 @@ class InvoiceValidator:
                 "material": invoice['line_item_description'],
                 "invoice_total": f"Rp {invoice['total_invoice_idr']:,}",
                 "po_total": f"Rp {po['total_amount_idr']:,}",
-                "due_date": invoice['due_date']
+                "due_date": format_date(invoice['due_date'])
             }
-        }
\ No newline at end of file
+        }
+    
+    def _po_table(self):
+        """PO columns the matcher joins on, one row per po_number (first wins, as in validate)"""
+        table = self.data_store.table('purchase_orders')
+        version, pos = self._pos_for_matching
+        if version != table.version:
+            pos = table.frame[PO_COLUMNS].drop_duplicates('po_number')
+            self._pos_for_matching = (table.version, pos)
+        return pos
+    
+    def match_frame(self, invoices):
+        """
+        Vectorized 3-way match of a frame of invoices (INVOICE_COLUMNS) against POs and goods receipts
+        
+        One merge joins every invoice to its PO; all checks and discrepancy
+        amounts are computed as columns. Returns one result row per invoice.
+        """
+        merged = invoices[INVOICE_COLUMNS].merge(
+            self._po_table(), on='po_number', how='left', suffixes=('', '_po'), indicator=True
+        )
+        po_found = (merged['_merge'] == 'both').to_numpy()
+        
+        # Nullable ints: invoices without a PO get <NA> diffs instead of NaN floats
+        quantity = merged['quantity_invoiced'].astype('Int64')
+        po_quantity = merged['quantity'].astype('Int64')
+        received = merged['received_quantity'].astype('Int64')
+        price = merged['unit_price_idr'].astype('Int64')
+        po_price = merged['unit_price_idr_po'].astype('Int64')
+        total = merged['total_invoice_idr'].astype('Int64')
+        po_total = merged['total_amount_idr'].astype('Int64')
+        
+        result = pd.DataFrame({
+            'invoice_number': merged['invoice_number'].astype(str),
+            'po_number': merged['po_number'].astype(str),
+            # Categoricals with different categories cannot be compared directly
+            'supplier_match': po_found & (merged['supplier_id'].astype(str) == merged['supplier_id_po'].astype(str)),
+            'material_match': po_found & (merged['material_code'].astype(str) == merged['material_code_po'].astype(str)),
+            'quantity_match': (quantity == po_quantity).fillna(False).astype(bool),
+            'price_match': (price == po_price).fillna(False).astype(bool),
+            'total_match': (total == po_total).fillna(False).astype(bool),
+            'receipt_match': (quantity <= received).fillna(False).astype(bool),
+            'quantity_diff': quantity - po_quantity,
+            'receipt_diff': quantity - received,
+            'price_diff_pct': ((price / po_price - 1) * 100).round(2),
+            'total_diff_idr': total - po_total,
+            'invoice_total_idr': total,
+        })
+        approved = result[STATUS_CHECKS].all(axis=1).to_numpy()
+        status = np.where(approved, "APPROVED", "REVIEW REQUIRED")
+        result.insert(2, 'status', np.where(po_found, status, "PO NOT FOUND"))
+        return result
+    
+    def iter_validate(self, invoice_numbers=None, invoices=None, chunk_rows=INVOICE_BATCH_CHUNK_ROWS):
+        """
+        Bulk validation in chunks of chunk_rows invoices, yielding one result frame per chunk
+        
+        Args:
+            invoice_numbers: invoices to look up in the store, in the order given;
+                unknown numbers get status NOT FOUND
+            invoices: frame of invoices to match instead (e.g. an uploaded CSV)
+            
+            With neither, every invoice in the store is validated.
+        """
+        if invoice_numbers is None:
+            frame = self.invoices_df if invoices is None else invoices
+            for start in range(0, len(frame), chunk_rows):
+                yield self.match_frame(frame.iloc[start:start + chunk_rows])
+            return
+        
+        table = self.data_store.table('invoices')
+        for start in range(0, len(invoice_numbers), chunk_rows):
+            chunk = list(invoice_numbers[start:start + chunk_rows])
+            positions = [table.key_index.get(number) for number in chunk]
+            found = [i for i, position in enumerate(positions) if position is not None]
+            result = self.match_frame(table.frame.iloc[[positions[i] for i in found]])
+            result.index = found
+            missing = [i for i, position in enumerate(positions) if position is None]
+            if missing:
+                result = pd.concat([result, pd.DataFrame(
+                    {'invoice_number': [str(chunk[i]) for i in missing], 'status': "NOT FOUND"}, index=missing
+                )]).sort_index()
+            yield result.reset_index(drop=True)
+    
+    def validate_many(self, invoice_numbers=None, invoices=None):
+        """Vectorized 3-way matching of many invoices; one result row per invoice"""
+        frames = list(self.iter_validate(invoice_numbers, invoices))
+        if not frames:
+            return self.match_frame(self.invoices_df.iloc[:0])
+        return pd.concat(frames, ignore_index=True)
+    
+    def validate_all(self, pending_only=False):
+        """Month-end run: every invoice in the store, or only those not yet paid"""
+        invoices = self.invoices_df
+        if pending_only:
+            invoices = invoices[invoices['payment_status'] != 'Paid']
+        return self.validate_many(invoices=invoices)
+    
+    def report(self, results):
+        """Compact report of a validate_many result: summary counts and one record per invoice"""
+        return {"summary": summarize_results(results), "results": result_records(results)}
+    
+    def stream_report(self, invoice_numbers=None, invoices=None):
+        """
+        NDJSON report, one text block per chunk: a line per invoice, then a {"summary": ...} line
+        """
+        frames = []
+        for frame in self.iter_validate(invoice_numbers, invoices):
+            frames.append(frame)
+            yield "".join(json.dumps(record) + "\n" for record in result_records(frame))
+        results = pd.concat(frames, ignore_index=True) if frames else self.match_frame(self.invoices_df.iloc[:0])
+        yield json.dumps({"summary": summarize_results(results)}) + "\n"
+
+
+def read_invoice_csv(file):
+    """
+    Invoices uploaded as CSV (path or file object), with typed columns
+    
+    Amounts must be whole numbers and dates parseable, so bad values are
+    rejected here (ValueError) rather than in the middle of a streamed run.
+    """
+    invoices = pd.read_csv(file)
+    missing = [column for column in INVOICE_COLUMNS if column not in invoices.columns]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    
+    for column in INVOICE_AMOUNT_COLUMNS:
+        try:
+            values = pd.to_numeric(invoices[column], errors='raise')
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"CSV column {column}: {e}") from None
+        if values.isna().any() or (values % 1 != 0).any():
+            raise ValueError(f"CSV column {column}: every row needs a whole number")
+        invoices[column] = values.astype('int64')
+    
+    for column in TABLE_SCHEMAS['invoices']['dates']:
+        if column in invoices.columns:
+            try:
+                invoices[column] = pd.to_datetime(invoices[column], errors='raise')
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"CSV column {column}: {e}") from None
+    return invoices
+
+
+def summarize_results(results):
+    """Status counts, failed checks and amounts over validate_many results"""
+    matched = results[results['status'].isin(["APPROVED", "REVIEW REQUIRED"])]
+    review = matched[matched['status'] == "REVIEW REQUIRED"]
+    return {
+        "invoices": len(results),
+        "status_counts": {status: int(count) for status, count in results['status'].value_counts().items()},
+        "failed_checks": {
+            check: int((~matched[check].astype(bool)).sum())
+            for check in ['supplier_match', 'material_match'] + STATUS_CHECKS
+        },
+        "invoiced_total_idr": int(matched['invoice_total_idr'].sum()),
+        "review_total_idr": int(review['invoice_total_idr'].sum()),
+        "total_discrepancy_idr": int(review['total_diff_idr'].abs().sum()),
+    }
+
+
+def result_records(results):
+    """Result rows as JSON-safe dicts (missing values as None)"""
+    return results.astype(object).where(results.notna(), None).to_dict('records')